@@ -0,0 +1,276 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import InvalidPage
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.caching import (
+    LOCK_POLL_INTERVAL,
+    check_conditions,
+    patch_conditional_headers,
+    recipe_list_cache_key,
+    recipe_validators,
+    request_versions,
+    table_validators,
+)
+from api.connections import check_connections, mark_connections
+from api.pagination import (
+    CountlessPaginator,
+    CustomPageNumberPagination,
+    RecipeCursorPagination,
+    estimate_count,
+)
+from api.serializers import (
+    IngredientSerializer,
+    RecipeReadSerializer,
+    TagSerializer,
+)
+from api.utils import get_int_param
+from api.viewer import get_viewer_state
+from api.views import filter_recipes
+from recipes import versions
+from recipes.ingredient_index import search_ingredients
+from recipes.models import Recipe, Tag
+
+
+def _call(func, *args, **kwargs):
+    check_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+        mark_connections()
+
+
+async def run(func, *args, **kwargs):
+    return await sync_to_async(_call, thread_sensitive=False)(
+        func, *args, **kwargs)
+
+
+def render(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status,
+        content_type='application/json')
+
+
+def authenticate(request):
+    request = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    request.user
+    return request
+
+
+def async_api_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request = await run(authenticate, request)
+            return await view(request, *args, **kwargs)
+        except Http404:
+            exception = NotFound()
+        except APIException as error:
+            exception = error
+        detail = exception.detail
+        if not isinstance(detail, (list, dict)):
+            detail = {'detail': detail}
+        response = render(detail, exception.status_code)
+        if exception.status_code == 401:
+            response['WWW-Authenticate'] = 'Token'
+        return response
+    return wrapper
+
+
+def async_conditional(validators):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            conditions, response = await run(
+                check_conditions, request, validators, *args, **kwargs)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            return patch_conditional_headers(response, *conditions)
+        return wrapper
+    return decorator
+
+
+def read_path(async_view, sync_view):
+    if not settings.ASYNC_READ_VIEWS:
+        return sync_view
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    view.cls = sync_view.cls
+    return view
+
+
+async def load_viewer_state(request):
+    viewer_state = get_viewer_state(request)
+    if request.user.is_authenticated:
+        await asyncio.gather(*(
+            run(getattr, viewer_state, name)
+            for name in ('favorite_ids', 'shopping_cart_ids',
+                         'subscription_ids')))
+    return viewer_state
+
+
+async def paginate(paginator, queryset, request):
+    count_mode = request.query_params.get(
+        paginator.count_query_param, 'exact')
+    if count_mode not in paginator.count_paginator_classes:
+        raise ValidationError({paginator.count_query_param: (
+            f'Must be one of: '
+            f'{", ".join(paginator.count_paginator_classes)}.')})
+    page_size = paginator.get_page_size(request)
+    try:
+        number = CountlessPaginator([], page_size).validate_number(
+            request.query_params.get(paginator.page_query_param, 1))
+    except InvalidPage:
+        raise NotFound(paginator.invalid_page_message.format(
+            page_number=request.query_params.get(
+                paginator.page_query_param), message=''))
+    bottom = (number - 1) * page_size
+
+    if count_mode == 'none':
+        rows = await run(list, queryset[bottom:bottom + page_size + 1])
+        has_next = len(rows) > page_size
+        rows, count = rows[:page_size], None
+    else:
+        counter = (queryset.count if count_mode == 'exact'
+                   else lambda: estimate_count(queryset))
+        rows, count = await asyncio.gather(
+            run(list, queryset[bottom:bottom + page_size]), run(counter))
+        has_next = bottom + page_size < count
+    if not rows and number > 1:
+        raise NotFound(paginator.invalid_page_message.format(
+            page_number=number, message='That page contains no results'))
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if has_next:
+        next_url = replace_query_param(
+            url, paginator.page_query_param, number + 1)
+    if number == 2:
+        previous_url = remove_query_param(url, paginator.page_query_param)
+    elif number > 2:
+        previous_url = replace_query_param(
+            url, paginator.page_query_param, number - 1)
+    return rows, OrderedDict([
+        ('count', count),
+        ('next', next_url),
+        ('previous', previous_url),
+    ])
+
+
+async def list_recipes(request):
+    recipes = await run(
+        filter_recipes, request, Recipe.objects.with_related())
+    cursor = (CursorPagination.cursor_query_param in request.query_params
+              and not request.query_params.get('search', '').strip())
+
+    if cursor:
+        paginator = RecipeCursorPagination()
+        rows, viewer_state = await asyncio.gather(
+            run(paginator.paginate_queryset, recipes, request),
+            load_viewer_state(request))
+    else:
+        (rows, page), viewer_state = await asyncio.gather(
+            paginate(CustomPageNumberPagination(), recipes, request),
+            load_viewer_state(request))
+
+    for recipe in rows:
+        recipe.is_favorited = viewer_state.is_favorited(recipe)
+        recipe.is_in_shopping_cart = viewer_state.is_in_shopping_cart(recipe)
+        recipe.author_is_subscribed = viewer_state.is_subscribed(
+            recipe.author)
+    data = await run(lambda: RecipeReadSerializer(
+        rows, many=True, context={'request': request}).data)
+
+    if cursor:
+        return paginator.get_paginated_response(data).data
+    page['results'] = data
+    return page
+
+
+async def cached_list_recipes(request):
+    cache = caches['recipes']
+    key = await run(recipe_list_cache_key, request)
+    data = await run(cache.get, key)
+    if data is not None:
+        return data
+
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.RECIPES_CACHE_LOCK_TIMEOUT
+    if await run(cache.add, lock_key, True, timeout=lock_timeout):
+        try:
+            data = await list_recipes(request)
+            await run(cache.set, key, data)
+        finally:
+            await run(cache.delete, lock_key)
+        return data
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        data = await run(cache.get, key)
+        if data is not None:
+            return data
+    return await list_recipes(request)
+
+
+@async_api_view
+@async_conditional(table_validators(versions.TAGS))
+async def tag_list(request):
+    return render(await run(lambda: TagSerializer(
+        Tag.objects.all(), many=True, context={'request': request}).data))
+
+
+@async_api_view
+@async_conditional(table_validators(versions.INGREDIENTS))
+async def ingredient_list(request):
+    def serialize():
+        name = request.query_params.get('name')
+        limit = get_int_param(request, 'limit', min_value=1)
+        version = request_versions(request, versions.INGREDIENTS)
+        ingredients = search_ingredients(
+            name, limit, version[versions.INGREDIENTS].version)
+        return IngredientSerializer(
+            ingredients, many=True, context={'request': request}).data
+
+    return render(await run(serialize))
+
+
+@async_api_view
+async def recipe_list(request):
+    if request.user.is_authenticated:
+        return render(await list_recipes(request))
+    return render(await cached_list_recipes(request))
+
+
+@async_api_view
+@async_conditional(recipe_validators)
+async def recipe_detail(request, pk):
+    recipe = await run(Recipe.objects.with_related().with_user_flags(
+        request.user).filter(pk=pk).first)
+    if recipe is None:
+        raise Http404
+    return render(await run(lambda: RecipeReadSerializer(
+        recipe, context={'request': request}).data))
@@ -0,0 +1,18 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class BoundedLocMemCache(LocMemCache):
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_bytes = params.get('OPTIONS', {}).get('MAX_BYTES')
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        super()._set(key, value, timeout)
+        if self._max_bytes is None:
+            return
+        size = sum(len(pickled) for pickled in self._cache.values())
+        while size > self._max_bytes and self._cache:
+            evicted_key, evicted = self._cache.popitem()
+            del self._expire_info[evicted_key]
+            size -= len(evicted)
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import time
+from calendar import timegm
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from recipes import versions
+from recipes.models import Recipe
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def request_versions(request, *tables):
+    cached = request.__dict__.setdefault('_table_versions', {})
+    missing = [table for table in tables if table not in cached]
+    if missing:
+        cached.update(versions.get_versions(*missing))
+    return {table: cached[table] for table in tables}
+
+
+def make_etag(*parts):
+    return hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def check_conditions(request, validators, *args, **kwargs):
+    etag, last_modified, cache_control = validators(
+        request, *args, **kwargs)
+    etag = quote_etag(etag) if etag else None
+    timestamp = (timegm(last_modified.utctimetuple())
+                 if last_modified else None)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp)
+    return (etag, timestamp, cache_control), response
+
+
+def patch_conditional_headers(response, etag, timestamp, cache_control):
+    if response.status_code in (200, 304) and etag:
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, **cache_control)
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional(validators):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            conditions, response = check_conditions(
+                request, validators, *args, **kwargs)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            return patch_conditional_headers(response, *conditions)
+        return wrapper
+    return decorator
+
+
+def public_cache_control():
+    return {'public': True, 'max_age': settings.API_CACHE_MAX_AGE}
+
+
+def table_validators(table):
+    def validators(request, pk=None):
+        version = request_versions(request, table)[table]
+        return (make_etag(table, version.version, pk),
+                version.updated_at,
+                public_cache_control())
+    return validators
+
+
+def recipe_validators(request, pk):
+    row = Recipe.objects.with_user_flags(request.user).filter(
+        pk=pk).values_list(
+            'updated_at', 'is_favorited', 'is_in_shopping_cart',
+            'author_is_subscribed').first()
+    if row is None:
+        return None, None, {}
+    updated_at, *flags = row
+
+    related = request_versions(
+        request, versions.TAGS, versions.INGREDIENTS, versions.USERS)
+    etag = make_etag(
+        'recipe', pk, updated_at.isoformat(), request.user.pk, *flags,
+        *(version.version for version in related.values()))
+
+    if request.user.is_authenticated:
+        return etag, None, {'private': True, 'no_cache': True}
+    last_modified = max(
+        [updated_at] + [version.updated_at for version in related.values()
+                        if version.updated_at])
+    return etag, last_modified, {'public': True, 'no_cache': True}
+
+
+def recipe_list_cache_key(request):
+    related = request_versions(
+        request, versions.RECIPES, versions.TAGS,
+        versions.INGREDIENTS, versions.USERS)
+    generation = '.'.join(
+        str(version.version) for version in related.values())
+    query = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values if value != ''))
+    return (f'recipes:list:{generation}:'
+            f'{make_etag(request.get_host(), query)}')
+
+
+def cached_recipe_list(request, build):
+    if request.user.is_authenticated:
+        return build()
+
+    cache = caches['recipes']
+    key = recipe_list_cache_key(request)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.RECIPES_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, True, timeout=lock_timeout):
+        try:
+            data = build()
+            cache.set(key, data)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return build()
+
+
+class VersionBatchMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = versions.start_batch()
+        try:
+            return self.get_response(request)
+        finally:
+            tables = versions.finish_batch(token)
+            if tables:
+                versions.bump(*tables)
+
+    async def __acall__(self, request):
+        token = versions.start_batch()
+        try:
+            return await self.get_response(request)
+        finally:
+            tables = versions.finish_batch(token)
+            if tables:
+                await sync_to_async(versions.bump)(*tables)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+def check_connections():
+    now = time.monotonic()
+    for connection in connections.all():
+        if (connection.connection is None
+                or connection.in_atomic_block
+                or not connection.settings_dict.get('CONN_HEALTH_CHECKS')):
+            continue
+        idle = now - getattr(connection, 'last_used', 0)
+        if idle >= settings.DB_HEALTH_CHECK_INTERVAL and (
+                not connection.is_usable()):
+            connection.close()
+
+
+def mark_connections():
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+@receiver(request_started)
+def check_on_request(sender, **kwargs):
+    check_connections()
+
+
+@receiver(request_finished)
+def mark_on_request(sender, **kwargs):
+    mark_connections()
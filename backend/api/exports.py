@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import NotAcceptable
+
+from recipes.models import ShoppingListItem
+
+CHUNK_SIZE = 500
+
+
+def shopping_list_rows(user):
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit',
+        'amount').order_by('-amount').iterator(chunk_size=CHUNK_SIZE)
+
+
+def export_txt(rows):
+    for name, measurement_unit, amount in rows:
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_json(rows):
+    separator = ''
+    yield '['
+    for name, measurement_unit, amount in rows:
+        item = json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        }, ensure_ascii=False)
+        yield f'{separator}{item}'
+        separator = ','
+    yield ']'
+
+
+def export_pdf(rows):
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFError, TTFont
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        raise NotAcceptable('PDF export is not available')
+
+    font_name = 'ShoppingCartFont'
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        try:
+            pdfmetrics.registerFont(
+                TTFont(font_name, settings.SHOPPING_CART_PDF_FONT))
+        except TTFError:
+            raise NotAcceptable('PDF export is not available')
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    y = height - margin
+    pdf.setFont(font_name, 12)
+    for line in export_txt(rows):
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font_name, 12)
+            y = height - margin
+        pdf.drawString(margin, y, line.rstrip('\n'))
+        y -= line_height
+    pdf.save()
+    return [buffer.getvalue()]
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+    'pdf': export_pdf,
+}
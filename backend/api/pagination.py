@@ -1,6 +1,109 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+APPROXIMATE_COUNT_TIMEOUT = 60
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.sql_with_params()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    key = 'count:' + hashlib.sha1(
+        f'{sql}:{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, APPROXIMATE_COUNT_TIMEOUT)
+    return count
+
+
+class ApproximateCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class CountlessPaginator(Paginator):
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise InvalidPage('That page number is not an integer')
+        if number < 1:
+            raise InvalidPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise InvalidPage('That page contains no results')
+        self.count = bottom + len(rows)
+        return Page(rows[:self.per_page], number, self)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+    count_paginator_classes = {
+        'exact': Paginator,
+        'approx': ApproximateCountPaginator,
+        'none': CountlessPaginator,
+    }
+    cursor_pagination_class = None
+
+    def get_paginator(self, request):
+        if (self.cursor_pagination_class is not None
+                and CursorPagination.cursor_query_param
+                in request.query_params):
+            return self.cursor_pagination_class()
+        return self
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = request.query_params.get(
+            self.count_query_param, 'exact')
+        if self.count_mode not in self.count_paginator_classes:
+            raise ValidationError({self.count_query_param: (
+                f'Must be one of: '
+                f'{", ".join(self.count_paginator_classes)}.')})
+        self.django_paginator_class = self.count_paginator_classes[
+            self.count_mode]
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        count = self.page.paginator.count
+        if self.count_mode == 'none':
+            count = None
+        return Response(OrderedDict([
+            ('count', count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', 'id')
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('id',)
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.db import connections
+
+from api.utils import get_view_attribute
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+MAX_DUPLICATES = 20
+
+PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+WHITESPACE = re.compile(r'\s+')
+
+_profile = ContextVar('query_profile', default=None)
+_serializing = ContextVar('serializing', default=False)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def fingerprint(sql):
+    sql = PLACEHOLDER_LIST.sub('(...)', sql)
+    sql = WHITESPACE.sub(' ', LITERAL.sub('?', sql)).strip()
+    return hashlib.sha1(sql.encode()).hexdigest()[:12], sql
+
+
+class RequestProfile:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.statements = Counter()
+        self.samples = {}
+
+    def record_query(self, sql, duration):
+        key, normalized = fingerprint(sql)
+        with self.lock:
+            self.queries += 1
+            self.sql_time += duration
+            self.statements[key] += 1
+            self.samples.setdefault(key, normalized)
+
+    def record_serializer(self, duration):
+        with self.lock:
+            self.serializer_time += duration
+
+    def duplicates(self):
+        return [(key, count) for key, count in self.statements.most_common()
+                if count > 1]
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, time.perf_counter() - started)
+
+
+def install_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ProfiledSerializerMixin:
+    def to_representation(self, instance):
+        profile = _profile.get()
+        if profile is None or _serializing.get():
+            return super().to_representation(instance)
+        token = _serializing.set(True)
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.record_serializer(time.perf_counter() - started)
+            _serializing.reset(token)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.over_budget = 0
+        self.max_queries = 0
+        self.total_queries = 0
+        self.total_time = 0.0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.query_counts = Histogram(QUERY_BUCKETS)
+        self.duplicates = {}
+
+    def add(self, profile, elapsed, over_budget):
+        self.requests += 1
+        self.over_budget += over_budget
+        self.max_queries = max(self.max_queries, profile.queries)
+        self.total_queries += profile.queries
+        self.total_time += elapsed
+        self.sql_time += profile.sql_time
+        self.serializer_time += profile.serializer_time
+        self.latency.add(elapsed * 1000)
+        self.query_counts.add(profile.queries)
+        for key, count in profile.duplicates():
+            if key in self.duplicates:
+                self.duplicates[key]['requests'] += 1
+                self.duplicates[key]['max'] = max(
+                    self.duplicates[key]['max'], count)
+            elif len(self.duplicates) < MAX_DUPLICATES:
+                self.duplicates[key] = {
+                    'sql': profile.samples[key], 'requests': 1, 'max': count}
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'over_budget': self.over_budget,
+            'max_queries': self.max_queries,
+            'total_queries': self.total_queries,
+            'total_time': self.total_time,
+            'sql_time': self.sql_time,
+            'serializer_time': self.serializer_time,
+            'latency': self.latency.counts,
+            'queries': self.query_counts.counts,
+            'duplicates': self.duplicates,
+        }
+
+
+class RouteReport:
+    def __init__(self, report_dir, flush_interval):
+        self.report_dir = report_dir
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, route, profile, elapsed, over_budget):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.add(profile, elapsed, over_budget)
+            if time.monotonic() - self.flushed_at < self.flush_interval:
+                return
+            self.flushed_at = time.monotonic()
+            routes = {
+                route: stats.as_dict()
+                for route, stats in self.routes.items()
+            }
+        self.flush(routes)
+
+    def flush(self, routes):
+        if not self.report_dir:
+            return
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f'queries-{os.getpid()}.json')
+        temporary = f'{path}.part'
+        with open(temporary, 'w') as report:
+            json.dump({
+                'latency_buckets': LATENCY_BUCKETS,
+                'query_buckets': QUERY_BUCKETS,
+                'routes': routes,
+            }, report)
+        os.replace(temporary, path)
+
+
+def server_timing(profile, elapsed, budget):
+    metrics = [
+        f'db;dur={profile.sql_time * 1000:.1f};'
+        f'desc="{profile.queries} queries"',
+        f'serializer;dur={profile.serializer_time * 1000:.1f}',
+        f'total;dur={elapsed * 1000:.1f}',
+    ]
+    duplicates = profile.duplicates()
+    if duplicates:
+        repeated = ' '.join(
+            f'{key}x{count}' for key, count in duplicates[:3])
+        metrics.append(f'dup;desc="{repeated}"')
+    if budget is not None:
+        metrics.append(f'budget;desc="{profile.queries}/{budget}"')
+    return ', '.join(metrics)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = settings.QUERY_PROFILING
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.strict = options['STRICT']
+        self.report = RouteReport(
+            options['REPORT_DIR'], options['FLUSH_INTERVAL'])
+        connection_created.connect(install_wrapper)
+        for connection in connections.all():
+            install_wrapper(None, connection)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.annotate(request, response, profile, started)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.annotate(request, response, profile, started)
+
+    def annotate(self, request, response, profile, started):
+        budget = getattr(request, 'query_budget', None)
+        match = request.resolver_match
+        route = f'{request.method} /{match.route}' if match else None
+        if response.streaming:
+            response['Server-Timing'] = server_timing(
+                profile, time.perf_counter() - started, None)
+            response.streaming_content = self.stream(
+                response.streaming_content, profile, started, route, budget)
+            return response
+
+        elapsed = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(profile, elapsed, budget)
+        self.finish(profile, elapsed, route, budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_view_attribute(
+            view_func, request.method.lower(), 'query_budget')
+
+    def stream(self, content, profile, started, route, budget):
+        token = _profile.set(profile)
+        try:
+            yield from content
+        finally:
+            _profile.reset(token)
+        self.finish(profile, time.perf_counter() - started, route, budget)
+
+    def finish(self, profile, elapsed, route, budget):
+        over_budget = budget is not None and profile.queries > budget
+        if route is not None:
+            self.report.add(route, profile, elapsed, over_budget)
+        if not over_budget:
+            return
+        message = (f'{route} ran {profile.queries} queries, '
+                   f'budget is {budget}')
+        if self.strict:
+            duplicated = '\n'.join(
+                f'{count}x {profile.samples[key]}'
+                for key, count in profile.duplicates())
+            raise QueryBudgetExceeded(f'{message}\n{duplicated}'.strip())
+        logger.warning(message)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from api.utils import get_view_attribute
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_MODELS = {'authtoken.token', 'authtoken.tokenproxy'}
+LAG_QUERIES = {
+    'postgresql': (
+        'SELECT CASE WHEN pg_last_wal_receive_lsn() = '
+        'pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT(EPOCH FROM now() - '
+        'pg_last_xact_replay_timestamp()) END'),
+}
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+def replica_reads(view):
+    view.replica_reads = True
+    return view
+
+
+def replica_lag(alias):
+    connection = connections[alias]
+    connection.ensure_connection()
+    query = LAG_QUERIES.get(connection.vendor)
+    if query is None:
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+class Routing:
+    def __init__(self, alias=None):
+        self.alias = alias
+        self.active = False
+        self.view = None
+
+
+class ReplicaMonitor:
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self.lock = threading.Lock()
+        self.checked = {}
+        self.checking = set()
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self.lock:
+            checked_at, healthy = self.checked.get(alias, (None, False))
+            if alias in self.checking or checked_at is not None and (
+                    now - checked_at < settings.REPLICA_CHECK_INTERVAL):
+                return healthy
+            self.checking.add(alias)
+        healthy = False
+        try:
+            healthy = self.check(alias)
+        finally:
+            with self.lock:
+                self.checking.discard(alias)
+                self.checked[alias] = (now, healthy)
+        return healthy
+
+    def check(self, alias):
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError as error:
+            logger.warning('Replica %s is unavailable: %s', alias, error)
+            connections[alias].close()
+            return False
+        if lag > settings.REPLICA_MAX_LAG:
+            logger.warning('Replica %s is %.1fs behind', alias, lag)
+            return False
+        return True
+
+    def mark_unhealthy(self, alias):
+        with self.lock:
+            self.checked[alias] = (time.monotonic(), False)
+
+    def pick(self):
+        healthy = [alias for alias in self.aliases if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.active or routing.alias is None:
+            return None
+        if (model._meta.label_lower in PRIMARY_MODELS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db is not None:
+            return instance._state.db
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.monitor = ReplicaMonitor(settings.REPLICA_DATABASES)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = _routing.set(self.route(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        routing = await sync_to_async(self.route)(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, response)
+
+    def route(self, request):
+        if (request.method not in SAFE_METHODS
+                or settings.REPLICA_PIN_COOKIE in request.COOKIES):
+            return Routing()
+        return Routing(self.monitor.pick())
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is not None:
+            routing.active = bool(get_view_attribute(
+                view_func, request.method.lower(), 'replica_reads'))
+            routing.view = (view_func, view_args, view_kwargs)
+
+    def process_exception(self, request, exception):
+        routing = _routing.get()
+        if (routing is None or not routing.active or routing.alias is None
+                or not isinstance(exception, DatabaseError)):
+            return None
+        logger.warning('Replica %s failed, retrying on the primary: %s',
+                       routing.alias, exception)
+        self.monitor.mark_unhealthy(routing.alias)
+        connections[routing.alias].close()
+        routing.active = False
+        view_func, view_args, view_kwargs = routing.view
+        if asyncio.iscoroutinefunction(view_func):
+            view_func = async_to_sync(view_func)
+        return view_func(request, *view_args, **view_kwargs)
@@ -1,7 +1,15 @@
 import base64
-
-from django.core.files.base import ContentFile
-from django.contrib.auth.models import AnonymousUser
+import binascii
+from collections import Counter
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile
+)
+from django.db import transaction
 
 from djoser.serializers import (
     TokenCreateSerializer,
@@ -11,26 +19,31 @@ from djoser.serializers import (
 
 from rest_framework import serializers
 
+from api.profiling import ProfiledSerializerMixin
+from api.utils import get_int_param
+from api.viewer import get_viewer_state
+from recipes import shopping_list
+from recipes.images import VARIANTS
 from recipes.models import (
-    Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     RecipeTag,
-    ShoppingCart,
     Tag,
 )
-from users.models import Subscription, User
+from users.models import User
+from users.stats import get_stats
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -54,33 +67,119 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         model = RecipeIngredient
 
 
+def resolve_pks(queryset, pks):
+    objects = queryset.in_bulk(pks)
+    missing = [pk for pk in pks if pk not in objects]
+    if missing:
+        raise serializers.ValidationError(
+            f'Invalid pk(s) {", ".join(map(str, missing))} - '
+            f'object does not exist.')
+    return objects
+
+
+class PrimaryKeyListField(serializers.ListField):
+    child = serializers.IntegerField(min_value=1)
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pks = list(dict.fromkeys(super().to_internal_value(data)))
+        objects = resolve_pks(self.queryset.all(), pks)
+        return [objects[pk] for pk in pks]
+
+    def to_representation(self, data):
+        return [item.pk for item in data.all()]
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        ingredients = super().to_internal_value(data)
+        pks = [ingredient['id'] for ingredient in ingredients]
+        duplicates = sorted(
+            pk for pk, count in Counter(pks).items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Duplicate ingredient(s) '
+                f'{", ".join(map(str, duplicates))}.')
+        objects = resolve_pks(Ingredient.objects.all(), pks)
+        for ingredient in ingredients:
+            ingredient['id'] = objects[ingredient['id']]
+        return ingredients
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(min_value=1)
 
     class Meta:
         fields = ('id', 'amount')
         model = RecipeIngredient
+        list_serializer_class = RecipeIngredientListSerializer
 
 
 class Base64ImageField(serializers.ImageField):
     INVALID_FILE_MESSAGE = ('Пожалуйста, загрузите допустимое изображение.')
+    CHUNK_SIZE = 64 * 1024
+
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(imgstr, 'temp.' + ext, format[len('data:'):])
         return super().to_internal_value(data)
 
+    def decode(self, imgstr, name, content_type):
+        imgstr = ''.join(imgstr.split())
+        size = len(imgstr) * 3 // 4 - imgstr[-2:].count('=')
+        if size > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, size, None)
+        try:
+            for start in range(0, len(imgstr), self.CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    imgstr[start:start + self.CHUNK_SIZE], validate=True))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_image')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return {}
+        variants = recipe.image_variants or {}
+        if variants.get('source') != recipe.image.name:
+            variants = {}
+        request = self.context.get('request')
+        urls = {}
+        for name in VARIANTS:
+            if name in variants:
+                url = default_storage.url(variants[name])
+            else:
+                url = recipe.image.url
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     image = Base64ImageField()
 
     class Meta:
@@ -89,31 +188,25 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'image', 'name', 'text', 'cooking_time')
         read_only_fields = ('author',)
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
         recipe = Recipe.objects.create(**validated_data)
 
-        recipe_tag_lst_objs = []
-        for tag in tags:
-            recipe_tag_lst_objs.append(RecipeTag(recipe=recipe, tag=tag))
-        RecipeTag.objects.bulk_create(recipe_tag_lst_objs)
-
-        recipe_ingredient_lst_objs = []
-        for ingredient in ingredients:
-            current_ingredient = Ingredient.objects.get(
-                id=ingredient['id'].id
-            )
-            recipe_ingredient_lst_objs.append(RecipeIngredient(
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=recipe, tag=tag) for tag in tags])
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(
                 recipe=recipe,
-                ingredient=current_ingredient,
+                ingredient=ingredient['id'],
                 amount=ingredient['amount'])
-            )
-        RecipeIngredient.objects.bulk_create(recipe_ingredient_lst_objs)
+             for ingredient in ingredients])
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.image = validated_data.get('image', instance.image)
         instance.name = validated_data.get('name', instance.name)
@@ -125,30 +218,61 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
-        tags_lst, ingredients_lst = [], []
-
-        for tag in tags:
-            current_tag = Tag.objects.get(id=tag.id)
-            tags_lst.append(current_tag)
+        self.sync_tags(instance, {tag.id for tag in tags})
 
-        for ingredient in ingredients:
-            current_ingredient = Ingredient.objects.get(id=ingredient['id'].id)
-            RecipeIngredient.objects.get_or_create(
-                recipe=instance,
-                ingredient=current_ingredient,
-                amount=ingredient['amount']
-            )
-            ingredients_lst.append(current_ingredient.id)
-
-        instance.tags.set(tags_lst)
-        instance.ingredients.set(ingredients_lst)
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = self.sync_ingredients(instance, amounts)
 
         instance.save()
 
+        shopping_list.update_recipe(instance, old_amounts, amounts)
+
         return instance
 
+    def sync_tags(self, instance, tag_ids):
+        current_ids = set(RecipeTag.objects.filter(
+            recipe=instance).values_list('tag_id', flat=True))
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=instance, tag_id=tag_id)
+             for tag_id in tag_ids - current_ids])
+        removed_ids = current_ids - tag_ids
+        if removed_ids:
+            RecipeTag.objects.filter(
+                recipe=instance, tag_id__in=removed_ids).delete()
+
+    def sync_ingredients(self, instance, amounts):
+        current, old_amounts = {}, {}
+        to_update, to_delete = [], []
+        for row in RecipeIngredient.objects.filter(recipe=instance):
+            old_amounts[row.ingredient_id] = (
+                old_amounts.get(row.ingredient_id, 0) + row.amount)
+            if row.ingredient_id not in amounts or (
+                    row.ingredient_id in current):
+                to_delete.append(row.id)
+                continue
+            current[row.ingredient_id] = row
+            if row.amount != amounts[row.ingredient_id]:
+                row.amount = amounts[row.ingredient_id]
+                to_update.append(row)
+
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(
+                recipe=instance, ingredient_id=ingredient_id, amount=amount)
+             for ingredient_id, amount in amounts.items()
+             if ingredient_id not in current])
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_delete:
+            RecipeIngredient.objects.filter(id__in=to_delete).delete()
+
+        return old_amounts
+
     def to_representation(self, instance):
         request = self.context.get('request')
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user).get(pk=instance.pk)
         serializer = RecipeReadSerializer(
             instance,
             context={'request': request}
@@ -156,7 +280,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = serializers.SerializerMethodField(method_name='get_author')
     ingredients = serializers.SerializerMethodField(
@@ -169,16 +294,19 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         method_name='get_is_in_shopping_cart'
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_variants',
+                  'text', 'cooking_time')
         read_only_fields = ('__all__',)
 
     def get_author(self, obj):
         request = self.context.get('request')
+        if hasattr(obj, 'author_is_subscribed'):
+            obj.author.is_subscribed = obj.author_is_subscribed
         serializer = CustomUserSerializer(
             obj.author,
             context={'request': request}
@@ -186,25 +314,21 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_ingredients(self, obj):
-        queryset = RecipeIngredient.objects.filter(recipe=obj)
+        queryset = obj.recipeingredient_set.all()
         serializer = RecipeIngredientReadSerializer(queryset, many=True)
         return serializer.data
 
     def get_is_favorited(self, obj):
-        current_user = self.context.get('request').user
-        if isinstance(current_user, AnonymousUser):
-            return False
-        return Favorite.objects.filter(
-            user=current_user,
-            recipe=obj).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        viewer_state = get_viewer_state(self.context.get('request'))
+        return viewer_state.is_favorited(obj)
 
     def get_is_in_shopping_cart(self, obj):
-        current_user = self.context.get('request').user
-        if isinstance(current_user, AnonymousUser):
-            return False
-        return ShoppingCart.objects.filter(
-            user=current_user,
-            recipe=obj).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        viewer_state = get_viewer_state(self.context.get('request'))
+        return viewer_state.is_in_shopping_cart(obj)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -220,7 +344,7 @@ class CustomTokenCreateSerializer(TokenCreateSerializer):
         fields = ('password', 'email')
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(ProfiledSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed'
     )
@@ -231,24 +355,31 @@ class CustomUserSerializer(UserSerializer):
                   'first_name', 'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        current_user = self.context.get('request').user
-        auth = self.context.get('request').auth
-        if not auth:
-            return False
-        return Subscription.objects.filter(
-            subscriber=current_user,
-            author=obj
-        ).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        viewer_state = get_viewer_state(self.context.get('request'))
+        return viewer_state.is_subscribed(obj)
 
 
-class RecipeInfoSerializer(serializers.ModelSerializer):
+class RecipeInfoSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class PantryMatchSerializer(ProfiledSerializerMixin, serializers.Serializer):
+    recipe = RecipeInfoSerializer()
+    coverage = serializers.FloatField()
+    matched = serializers.IntegerField()
+    total = serializers.IntegerField()
+    missing = IngredientSerializer(many=True)
+
+
+class SubscriptionSerializer(ProfiledSerializerMixin,
+                             serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed'
     )
@@ -266,20 +397,17 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         read_only_fields = ('recipes',)
 
     def get_is_subscribed(self, obj):
-        current_user = self.context.get('request').user
-
-        return Subscription.objects.filter(
-            subscriber=current_user,
-            author=obj
-        ).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        viewer_state = get_viewer_state(self.context.get('request'))
+        return viewer_state.is_subscribed(obj)
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj)
-
-        if recipes_limit is not None:
-            recipes = recipes[:int(recipes_limit)]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.latest_per_author(
+                [obj.pk], get_int_param(request, 'recipes_limit'))
 
         serializer = RecipeInfoSerializer(
             recipes,
@@ -289,5 +417,4 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_recipes_count(self, obj):
-        recipe_count = Recipe.objects.filter(author=obj).count()
-        return recipe_count
+        return get_stats(obj).recipes_count
@@ -0,0 +1,71 @@
+import base64
+import io
+
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+)
+from users.models import User
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (200, 120, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def image_data():
+    return 'data:image/png;base64,' + base64.b64encode(png()).decode()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        password='password', first_name=username.title(),
+        last_name='Test')
+
+
+def create_tags(count):
+    return [
+        Tag.objects.create(
+            name=f'Tag {number}', color=f'#{number:06X}',
+            slug=f'tag-{number}')
+        for number in range(count)
+    ]
+
+
+def create_ingredients(count):
+    names = [f'ingredient {number}' for number in range(count)]
+    Ingredient.objects.bulk_create([
+        Ingredient(name=name, measurement_unit='г') for name in names])
+    return list(Ingredient.objects.filter(name__in=names).order_by('id'))
+
+
+def create_recipe(author, tags, ingredients, name='Recipe'):
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Text', cooking_time=10,
+        image=ContentFile(png(), name='recipe.png'))
+    RecipeTag.objects.bulk_create(
+        [RecipeTag(recipe=recipe, tag=tag) for tag in tags])
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                         amount=number + 1)
+        for number, ingredient in enumerate(ingredients)
+    ])
+    return recipe
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
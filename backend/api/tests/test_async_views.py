@@ -0,0 +1,48 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import AsyncRequestFactory, TransactionTestCase
+
+from api import async_views
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+
+
+class AsyncRecipeListTest(TransactionTestCase):
+    def setUp(self):
+        caches['recipes'].clear()
+        self.addCleanup(caches['recipes'].clear)
+        author = create_user('author')
+        tags = create_tags(2)
+        ingredients = create_ingredients(3)
+        for number in range(8):
+            create_recipe(author, tags, ingredients, name=f'Recipe {number}')
+
+    async def test_concurrent_anonymous_requests_share_one_build(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        asyncio.get_running_loop().set_default_executor(executor)
+        builds = []
+        list_recipes = async_views.list_recipes
+
+        async def counted(request):
+            builds.append(request)
+            return await list_recipes(request)
+
+        factory = AsyncRequestFactory()
+        with mock.patch.object(async_views, 'list_recipes', counted):
+            responses = await asyncio.wait_for(asyncio.gather(*(
+                async_views.recipe_list(factory.get('/api/recipes/'))
+                for _ in range(8))), timeout=10)
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(
+            {response.status_code for response in responses}, {200})
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(json.loads(responses[0].content)['count'], 8)
@@ -0,0 +1,101 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.cache_backends import BoundedLocMemCache
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.images import render_variants
+from recipes.models import Recipe, RecipeIngredient
+
+
+class RecipeDetailETagTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(
+                create_user('author'), create_tags(1), create_ingredients(2))
+        self.client = api_client()
+        self.path = f'/api/recipes/{self.recipe.pk}/'
+
+    def test_not_modified_until_ingredient_row_changes(self):
+        etag = self.client.get(self.path)['ETag']
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        row = RecipeIngredient.objects.filter(recipe=self.recipe).first()
+        row.amount = 99
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(99, [item['amount']
+                           for item in response.data['ingredients']])
+
+    def test_not_modified_until_variants_are_rendered(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(image_variants={})
+        response = self.client.get(self.path)
+        self.assertEqual(response.data['image_variants']['thumbnail'],
+                         response.data['image'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            render_variants(self.recipe.pk, self.recipe.image.name)
+        response = self.client.get(
+            self.path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['image_variants']['thumbnail'],
+                            response.data['image'])
+
+
+class RecipeListCacheTest(TestCase):
+    def setUp(self):
+        caches['recipes'].clear()
+        self.author = create_user('author')
+        self.tags = create_tags(1)
+        self.ingredients = create_ingredients(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.author, self.tags, self.ingredients)
+
+    def get(self, client, queries=None):
+        if queries is None:
+            return client.get('/api/recipes/')
+        with self.assertNumQueries(queries):
+            return client.get('/api/recipes/')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        first = self.get(api_client())
+        second = self.get(api_client(), queries=1)
+        self.assertEqual(first.data, second.data)
+
+    def test_new_recipe_starts_a_new_generation(self):
+        self.get(api_client())
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.author, self.tags, self.ingredients, 'New')
+        response = self.get(api_client())
+        self.assertEqual(response.data['count'], 2)
+
+    def test_authenticated_pages_are_not_cached(self):
+        client = api_client(create_user('reader'))
+        self.get(client)
+        with CaptureQueriesContext(connection) as context:
+            self.get(client)
+        self.assertGreater(len(context), 1)
+
+
+class BoundedLocMemCacheTest(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = BoundedLocMemCache(
+            'bounded-test', {'OPTIONS': {'MAX_BYTES': 300}})
+        cache.clear()
+        for key in ('a', 'b', 'c'):
+            cache.set(key, 'x' * 80)
+        cache.get('a')
+        cache.set('d', 'x' * 80)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('d'))
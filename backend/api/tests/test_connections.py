@@ -0,0 +1,75 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.connections import check_connections, mark_connections
+
+
+@override_settings(DB_HEALTH_CHECK_INTERVAL=10)
+class CheckConnectionsTest(SimpleTestCase):
+    def fake_connection(self, idle=60, usable=True, **options):
+        fake = mock.Mock(
+            connection=object(), in_atomic_block=False,
+            settings_dict={'CONN_HEALTH_CHECKS': True},
+            last_used=time.monotonic() - idle)
+        fake.is_usable.return_value = usable
+        for name, value in options.items():
+            setattr(fake, name, value)
+        return fake
+
+    def check(self, *fakes):
+        with mock.patch('api.connections.connections') as connections:
+            connections.all.return_value = fakes
+            check_connections()
+
+    def test_idle_broken_connection_is_closed(self):
+        fake = self.fake_connection(usable=False)
+        self.check(fake)
+        fake.is_usable.assert_called_once_with()
+        fake.close.assert_called_once_with()
+
+    def test_idle_healthy_connection_is_kept(self):
+        fake = self.fake_connection()
+        self.check(fake)
+        fake.is_usable.assert_called_once_with()
+        fake.close.assert_not_called()
+
+    def test_recently_used_connection_is_not_pinged(self):
+        fake = self.fake_connection(idle=1, usable=False)
+        self.check(fake)
+        fake.is_usable.assert_not_called()
+        fake.close.assert_not_called()
+
+    def test_skipped_connections(self):
+        fakes = [
+            self.fake_connection(usable=False, connection=None),
+            self.fake_connection(usable=False, in_atomic_block=True),
+            self.fake_connection(
+                usable=False, settings_dict={'CONN_HEALTH_CHECKS': False}),
+        ]
+        self.check(*fakes)
+        for fake in fakes:
+            fake.is_usable.assert_not_called()
+            fake.close.assert_not_called()
+
+    def test_mark_connections_touches_open_connections(self):
+        opened = self.fake_connection(idle=60)
+        closed = self.fake_connection(idle=60, connection=None)
+        before = closed.last_used
+        with mock.patch('api.connections.connections') as connections:
+            connections.all.return_value = [opened, closed]
+            mark_connections()
+        self.assertAlmostEqual(opened.last_used, time.monotonic(), delta=1)
+        self.assertEqual(closed.last_used, before)
+
+
+class RequestSignalsTest(TestCase):
+    def test_request_checks_and_marks_connections(self):
+        connection.last_used = 0
+        with mock.patch('api.connections.check_connections') as check:
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        check.assert_called_once_with()
+        self.assertGreater(connection.last_used, 0)
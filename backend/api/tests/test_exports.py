@@ -0,0 +1,38 @@
+from django.test import TestCase, override_settings
+
+from api.tests.fixtures import api_client, create_user
+
+
+class ShoppingCartExportTest(TestCase):
+    def setUp(self):
+        self.client = api_client(create_user('buyer'))
+
+    def test_text_export(self):
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SHOPPING_CART_PDF_FONT='/nonexistent/font.ttf')
+    def test_pdf_without_font_is_not_acceptable(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'pdf'})
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            response.json(), {'detail': 'PDF export is not available'})
+
+    def test_gzip_follows_accept_encoding_quality(self):
+        path = '/api/recipes/download_shopping_cart/'
+        for accept_encoding, gzipped in (
+                ('gzip, deflate', True),
+                ('deflate, gzip;q=0.5', True),
+                ('gzip;q=0', False),
+                ('gzip;q=0.0, identity', False),
+                ('*', True),
+                ('*, gzip;q=0', False),
+                ('', False)):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(
+                    path, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.get('Content-Encoding') == 'gzip', gzipped)
@@ -0,0 +1,91 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.models import Recipe
+from users.models import Subscription
+
+
+class RecipePaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        tags = create_tags(1)
+        ingredients = create_ingredients(1)
+        cls.recipes = [
+            create_recipe(cls.author, tags, ingredients, f'Recipe {number}')
+            for number in range(7)]
+        published = timezone.now()
+        Recipe.objects.filter(pk__in=[
+            recipe.pk for recipe in cls.recipes[1:6]]).update(
+                pub_date=published)
+        Recipe.objects.filter(pk=cls.recipes[0].pk).update(
+            pub_date=published - timezone.timedelta(hours=1))
+        Recipe.objects.filter(pk=cls.recipes[6].pk).update(
+            pub_date=published + timezone.timedelta(hours=1))
+
+    def walk(self, client, path, params):
+        ids = []
+        response = client.get(path, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if response.data['next'] is None:
+                return ids, response
+            response = client.get(response.data['next'])
+
+    def test_cursor_walks_tied_pub_dates_once(self):
+        ids, _ = self.walk(
+            api_client(), '/api/recipes/', {'cursor': '', 'limit': 2})
+        expected = [self.recipes[6].pk] + [
+            recipe.pk for recipe in self.recipes[1:6]] + [self.recipes[0].pk]
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pages_have_no_count(self):
+        response = api_client().get(
+            '/api/recipes/', {'cursor': '', 'limit': 3})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_count_modes(self):
+        client = api_client()
+        for mode, count in (('exact', 7), ('approx', 7), ('none', None)):
+            with self.subTest(mode=mode):
+                ids, response = self.walk(
+                    client, '/api/recipes/', {'count': mode, 'limit': 3})
+                self.assertEqual(len(set(ids)), 7)
+                self.assertEqual(response.data['count'], count)
+
+    def test_unknown_count_mode_is_rejected(self):
+        response = api_client().get('/api/recipes/', {'count': 'bad'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_countless_page_past_the_end_is_not_found(self):
+        response = api_client().get(
+            '/api/recipes/', {'count': 'none', 'page': 9})
+        self.assertEqual(response.status_code, 404)
+
+
+class SubscriptionPaginationTest(TestCase):
+    def test_cursor_walks_every_subscription(self):
+        user = create_user('reader')
+        authors = [create_user(f'author{number}') for number in range(5)]
+        for author in authors:
+            Subscription.objects.create(subscriber=user, author=author)
+        client = api_client(user)
+        ids = []
+        response = client.get(
+            '/api/users/subscriptions/', {'cursor': '', 'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = client.get(response.data['next'])
+        self.assertEqual(ids, [author.pk for author in authors])
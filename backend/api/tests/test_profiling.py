@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from api import views
+from api.profiling import QueryBudgetExceeded
+from api.tests.fixtures import api_client, create_user
+from users.models import Subscription
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.report_dir = directory.name
+        self.user = create_user('reader')
+        for number in range(3):
+            Subscription.objects.create(
+                subscriber=self.user, author=create_user(f'author{number}'))
+
+    def profiling(self, strict=False):
+        return override_settings(QUERY_PROFILING=dict(
+            settings.QUERY_PROFILING, ENABLED=True, STRICT=strict,
+            REPORT_DIR=self.report_dir, FLUSH_INTERVAL=0))
+
+    def budget(self, view, value):
+        return mock.patch.object(view, 'query_budget', value)
+
+    def get(self, path='/api/users/subscriptions/'):
+        return api_client(self.user).get(path)
+
+    def report(self):
+        path = os.path.join(self.report_dir, f'queries-{os.getpid()}.json')
+        with open(path) as report:
+            return json.load(report)['routes']
+
+    def test_within_budget(self):
+        with self.profiling(strict=True), \
+                mock.patch('api.profiling.logger') as logger:
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        logger.warning.assert_not_called()
+        self.assertIn('budget;desc="', response['Server-Timing'])
+        route = self.report()['GET /api/users/subscriptions/']
+        self.assertEqual((route['requests'], route['over_budget']), (1, 0))
+
+    def test_over_budget_is_reported(self):
+        with self.profiling(), self.budget(views.SubscriptionList.get, 1), \
+                self.assertLogs('api.profiling', 'WARNING') as logs:
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget is 1', logs.output[0])
+        self.assertRegex(response['Server-Timing'], r'budget;desc="\d+/1"')
+        route = self.report()['GET /api/users/subscriptions/']
+        self.assertEqual(route['over_budget'], 1)
+
+    def test_over_budget_fails_in_strict_mode(self):
+        with self.profiling(strict=True), \
+                self.budget(views.SubscriptionList.get, 1):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'budget is 1'):
+                self.get()
+
+    def test_streaming_response_is_checked_after_content(self):
+        with self.profiling(), \
+                self.budget(views.download_shopping_cart, 0), \
+                self.assertLogs('api.profiling', 'WARNING') as logs:
+            response = self.get('/api/recipes/download_shopping_cart/')
+            self.assertEqual(logs.output, [])
+            b''.join(response.streaming_content)
+        self.assertIn('budget is 0', logs.output[0])
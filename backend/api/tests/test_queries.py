@@ -0,0 +1,134 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+
+class RecipeReadQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{number}') for number in range(3)]
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(40)
+        Subscription.objects.create(
+            subscriber=cls.user, author=cls.authors[0])
+
+    def setUp(self):
+        self.client = api_client(self.user)
+
+    def create_recipes(self, count, ingredients=4):
+        recipes = []
+        start = Recipe.objects.count()
+        for number in range(count):
+            recipe = create_recipe(
+                self.authors[number % len(self.authors)],
+                self.tags[:number % len(self.tags) + 1],
+                self.ingredients[number:number + ingredients],
+                name=f'Recipe {start + number}')
+            if number % 2:
+                Favorite.objects.create(user=self.user, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, path, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.create_recipes(2)
+        small, response = self.count_queries('/api/recipes/', {'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_recipes(48)
+        large, response = self.count_queries('/api/recipes/', {'limit': 50})
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertEqual(small, large)
+
+    def test_list_flags_match_rows(self):
+        recipes = self.create_recipes(6)
+        _, response = self.count_queries('/api/recipes/', {'limit': 6})
+        rows = {row['id']: row for row in response.data['results']}
+        for number, recipe in enumerate(recipes):
+            row = rows[recipe.pk]
+            self.assertEqual(row['is_favorited'], bool(number % 2))
+            self.assertEqual(row['is_in_shopping_cart'], bool(number % 3))
+            self.assertEqual(
+                row['author']['is_subscribed'],
+                recipe.author_id == self.authors[0].pk)
+            self.assertEqual(
+                len(row['ingredients']), recipe.ingredients.count())
+
+    def test_detail_queries_do_not_grow_with_ingredients(self):
+        small_recipe, = self.create_recipes(1, ingredients=2)
+        large_recipe, = self.create_recipes(1, ingredients=35)
+        small, _ = self.count_queries(f'/api/recipes/{small_recipe.pk}/')
+        large, response = self.count_queries(
+            f'/api/recipes/{large_recipe.pk}/')
+        self.assertEqual(len(response.data['ingredients']), 35)
+        self.assertEqual(small, large)
+
+
+class SubscriptionQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{number}') for number in range(6)]
+        tags = create_tags(1)
+        ingredients = create_ingredients(1)
+        for number, author in enumerate(cls.authors):
+            Subscription.objects.create(subscriber=cls.user, author=author)
+            for recipe_number in range(number):
+                create_recipe(author, tags, ingredients,
+                              name=f'Recipe {number}.{recipe_number}')
+
+    def setUp(self):
+        self.client = api_client(self.user)
+
+    def count_queries(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_queries_do_not_grow_with_page_size_or_recipes_limit(self):
+        small, response = self.count_queries(
+            {'limit': 1, 'recipes_limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        large, response = self.count_queries(
+            {'limit': 6, 'recipes_limit': 10})
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(small, large)
+
+    def test_recipes_are_limited_per_author(self):
+        _, response = self.count_queries({'limit': 6, 'recipes_limit': 2})
+        for author, row in zip(self.authors, response.data['results']):
+            latest = Recipe.objects.filter(author=author).order_by(
+                '-pub_date', '-id').values_list('id', flat=True)[:2]
+            self.assertEqual(row['id'], author.pk)
+            self.assertTrue(row['is_subscribed'])
+            self.assertEqual(
+                row['recipes_count'], author.recipes.count())
+            self.assertEqual(
+                [recipe['id'] for recipe in row['recipes']], list(latest))
+
+    def test_invalid_recipes_limit_is_rejected(self):
+        for recipes_limit in ('many', '-1'):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'recipes_limit': recipes_limit})
+                self.assertEqual(response.status_code, 400)
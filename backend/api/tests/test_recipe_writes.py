@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+    image_data,
+)
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+
+class RecipeWriteQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(6)
+        cls.ingredients = create_ingredients(80)
+        create_recipe(cls.author, cls.tags[:1], cls.ingredients[:1])
+
+    def setUp(self):
+        self.client = api_client(self.author)
+        self.client.raise_request_exception = False
+
+    def payload(self, name, ingredients, tags, amount=10):
+        return {
+            'name': name,
+            'text': 'Text',
+            'cooking_time': 15,
+            'image': image_data(),
+            'tags': [tag.pk for tag in tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient in ingredients],
+        }
+
+    def create(self, name, ingredients, tags):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/recipes/', self.payload(name, ingredients, tags),
+                format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return len(context), Recipe.objects.get(name=name)
+
+    def patch(self, recipe, ingredients, tags, amount):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/recipes/{recipe.pk}/',
+                self.payload(recipe.name, ingredients, tags, amount),
+                format='json')
+        return len(context), response
+
+    def test_create_queries_do_not_grow_with_ingredients(self):
+        small, _ = self.create('Small', self.ingredients[:3], self.tags[:1])
+        large, recipe = self.create(
+            'Large', self.ingredients[:35], self.tags[:4])
+        self.assertEqual(small, large)
+        self.assertEqual(recipe.recipeingredient_set.count(), 35)
+
+    def test_patch_queries_do_not_grow_with_ingredients(self):
+        _, small_recipe = self.create(
+            'Small', self.ingredients[:3], self.tags[:1])
+        _, large_recipe = self.create(
+            'Large', self.ingredients[:35], self.tags[:3])
+
+        small, response = self.patch(
+            small_recipe, self.ingredients[1:4], self.tags[1:2], 20)
+        self.assertEqual(response.status_code, 200)
+        large, response = self.patch(
+            large_recipe, self.ingredients[10:50], self.tags[2:6], 20)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(small, large)
+
+        rows = RecipeIngredient.objects.filter(recipe=large_recipe)
+        self.assertEqual(
+            set(rows.values_list('ingredient_id', flat=True)),
+            {ingredient.pk for ingredient in self.ingredients[10:50]})
+        self.assertEqual(set(rows.values_list('amount', flat=True)), {20})
+        self.assertEqual(
+            set(RecipeTag.objects.filter(recipe=large_recipe).values_list(
+                'tag_id', flat=True)),
+            {tag.pk for tag in self.tags[2:6]})
+
+    def test_patch_is_atomic(self):
+        _, recipe = self.create('Large', self.ingredients[:35], self.tags[:2])
+        before = set(RecipeIngredient.objects.filter(
+            recipe=recipe).values_list('ingredient_id', 'amount'))
+
+        with mock.patch('recipes.shopping_list.update_recipe',
+                        side_effect=RuntimeError):
+            _, response = self.patch(
+                recipe, self.ingredients[20:60], self.tags[3:], 7)
+        self.assertEqual(response.status_code, 500)
+
+        self.assertEqual(set(RecipeIngredient.objects.filter(
+            recipe=recipe).values_list('ingredient_id', 'amount')), before)
+        self.assertEqual(
+            set(RecipeTag.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True)),
+            {tag.pk for tag in self.tags[:2]})
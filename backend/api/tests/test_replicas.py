@@ -0,0 +1,135 @@
+import threading
+from unittest import mock
+
+from django.db import OperationalError, connections
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from api.replicas import ReplicaMonitor
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'], REPLICA_CHECK_INTERVAL=0)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.recipe = create_recipe(
+            create_user('author'), create_tags(2), create_ingredients(3))
+        self.client = api_client(self.user)
+
+    def replica_queries(self, method, path):
+        with CaptureQueriesContext(connections['replica_0']) as context:
+            response = getattr(self.client, method)(path)
+        return response, len(context)
+
+    def test_opted_in_views_read_from_replica(self):
+        for path in ('/api/tags/', '/api/recipes/',
+                     f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(path=path):
+                response, queries = self.replica_queries('get', path)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(queries, 0)
+
+    def test_other_views_read_from_primary(self):
+        response, queries = self.replica_queries('get', '/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_writes_pin_reads_to_primary(self):
+        path = f'/api/recipes/{self.recipe.pk}/favorite/'
+        for method, status in (('post', 201), ('delete', 204)):
+            with self.subTest(method=method):
+                self.client.cookies.clear()
+                response, queries = self.replica_queries(method, path)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(queries, 0)
+                self.assertIn('primary_pin', response.cookies)
+
+                response, queries = self.replica_queries('get', '/api/tags/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(queries, 0)
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.delete(
+            f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('primary_pin', response.cookies)
+
+    @override_settings(REPLICA_CHECK_INTERVAL=60)
+    def test_replica_error_is_retried_on_primary(self):
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('replica went away')
+
+        with connections['replica_0'].execute_wrapper(fail), \
+                self.assertLogs('api.replicas', 'WARNING'):
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.recipe.pk)
+
+        response, queries = self.replica_queries('get', '/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    @override_settings(REPLICA_MAX_LAG=5)
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch('api.replicas.replica_lag', return_value=6), \
+                self.assertLogs('api.replicas', 'WARNING'):
+            response, queries = self.replica_queries('get', '/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_failed_lag_check_falls_back_to_primary(self):
+        with mock.patch('api.replicas.replica_lag',
+                        side_effect=OperationalError('down')), \
+                self.assertLogs('api.replicas', 'WARNING'):
+            response, queries = self.replica_queries('get', '/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+
+@override_settings(REPLICA_CHECK_INTERVAL=60, REPLICA_MAX_LAG=5)
+class ReplicaMonitorTest(SimpleTestCase):
+    def test_lag_check_is_single_flight(self):
+        monitor = ReplicaMonitor(['replica_0'])
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def replica_lag(alias):
+            started.set()
+            release.wait(5)
+            return 0
+
+        with mock.patch('api.replicas.replica_lag',
+                        side_effect=replica_lag) as lag:
+            checker = threading.Thread(target=lambda: results.append(
+                monitor.is_healthy('replica_0')))
+            checker.start()
+            started.wait(5)
+            self.assertFalse(monitor.is_healthy('replica_0'))
+            release.set()
+            checker.join(5)
+            self.assertEqual(results, [True])
+            self.assertTrue(monitor.is_healthy('replica_0'))
+        self.assertEqual(lag.call_count, 1)
+
+    def test_failed_check_is_remembered(self):
+        monitor = ReplicaMonitor(['replica_0'])
+        with mock.patch('api.replicas.replica_lag',
+                        side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            monitor.is_healthy('replica_0')
+        self.assertFalse(monitor.is_healthy('replica_0'))
+        self.assertEqual(monitor.checking, set())
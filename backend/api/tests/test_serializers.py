@@ -0,0 +1,59 @@
+from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import PrimaryKeyListField, RecipeIngredientSerializer
+from api.tests.fixtures import create_ingredients, create_tags
+from recipes.models import Tag
+
+
+class IngredientResolutionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = create_ingredients(40)
+
+    def validate(self, data):
+        serializer = RecipeIngredientSerializer(data=data, many=True)
+        return serializer.is_valid(), serializer
+
+    def test_ingredients_are_resolved_with_one_query(self):
+        data = [{'id': ingredient.pk, 'amount': number + 1}
+                for number, ingredient in enumerate(self.ingredients)]
+        with self.assertNumQueries(1):
+            valid, serializer = self.validate(data)
+        self.assertTrue(valid, serializer.errors)
+        self.assertEqual(
+            [item['id'] for item in serializer.validated_data],
+            self.ingredients)
+
+    def test_duplicates_are_rejected_without_queries(self):
+        first, second = self.ingredients[:2]
+        data = [{'id': first.pk, 'amount': 1}, {'id': second.pk, 'amount': 1},
+                {'id': first.pk, 'amount': 2}]
+        with self.assertNumQueries(0):
+            valid, serializer = self.validate(data)
+        self.assertFalse(valid)
+        self.assertIn(f'Duplicate ingredient(s) {first.pk}',
+                      str(serializer.errors))
+
+    def test_missing_ingredients_are_reported(self):
+        data = [{'id': self.ingredients[0].pk, 'amount': 1},
+                {'id': 999999, 'amount': 1}]
+        valid, serializer = self.validate(data)
+        self.assertFalse(valid)
+        self.assertIn('Invalid pk(s) 999999', str(serializer.errors))
+
+
+class PrimaryKeyListFieldTest(TestCase):
+    def test_tags_are_resolved_with_one_query_in_order(self):
+        tags = create_tags(5)
+        field = PrimaryKeyListField(queryset=Tag.objects.all())
+        pks = [tags[3].pk, tags[0].pk, tags[3].pk, tags[4].pk]
+        with self.assertNumQueries(1):
+            resolved = field.to_internal_value(pks)
+        self.assertEqual(resolved, [tags[3], tags[0], tags[4]])
+
+    def test_missing_tags_are_reported(self):
+        field = PrimaryKeyListField(queryset=Tag.objects.all())
+        with self.assertRaisesMessage(ValidationError,
+                                      'Invalid pk(s) 999999'):
+            field.to_internal_value([999999])
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class ShoppingCartAtomicityTest(TransactionTestCase):
+    def setUp(self):
+        self.user = create_user('buyer')
+        self.recipe = create_recipe(
+            create_user('author'), create_tags(1), create_ingredients(3))
+        self.client = api_client(self.user)
+        self.client.raise_request_exception = False
+
+    def test_add_updates_list(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            ShoppingListItem.objects.filter(user=self.user).count(), 3)
+
+    def test_failed_list_update_rolls_back_add(self):
+        with mock.patch('recipes.shopping_list.apply_deltas',
+                        side_effect=RuntimeError):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.carts_count, 0)
+
+    def test_failed_list_update_rolls_back_remove(self):
+        self.client.post(f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+        with mock.patch('recipes.shopping_list.apply_deltas',
+                        side_effect=RuntimeError):
+            response = self.client.delete(
+                f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 500)
+        self.assertTrue(ShoppingCart.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            ShoppingListItem.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+    image_data,
+)
+from recipes import versions
+
+
+class VersionBatchTest(TransactionTestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.tags = create_tags(3)
+        self.ingredients = create_ingredients(12)
+        self.recipe = create_recipe(
+            self.author, self.tags[:2], self.ingredients[:6])
+        self.client = api_client(self.author)
+
+    def test_write_request_bumps_versions_once(self):
+        before = versions.get_versions(versions.RECIPES)[versions.RECIPES]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {
+                    'name': 'Edited',
+                    'text': 'Text',
+                    'cooking_time': 20,
+                    'image': image_data(),
+                    'tags': [self.tags[2].pk],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 5}
+                        for ingredient in self.ingredients[3:]],
+                }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        bumps = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "recipes_tableversion"')]
+        self.assertEqual(len(bumps), 1)
+        after = versions.get_versions(versions.RECIPES)[versions.RECIPES]
+        self.assertEqual(after.version, before.version + 1)
+
+    def test_bump_outside_requests_is_immediate(self):
+        before = versions.get_versions(versions.TAGS)[versions.TAGS]
+        versions.bump_on_commit(versions.TAGS)
+        after = versions.get_versions(versions.TAGS)[versions.TAGS]
+        self.assertEqual(after.version, before.version + 1)
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from api.viewer import ViewerState, get_viewer_state
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class ViewerStateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        tags = create_tags(1)
+        ingredients = create_ingredients(1)
+        cls.favorite = create_recipe(cls.author, tags, ingredients, 'One')
+        cls.other = create_recipe(cls.author, tags, ingredients, 'Two')
+        Favorite.objects.create(user=cls.user, recipe=cls.favorite)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.other)
+        Subscription.objects.create(subscriber=cls.user, author=cls.author)
+
+    def test_flags_are_resolved_with_one_query_per_relation(self):
+        state = ViewerState(self.user)
+        with self.assertNumQueries(3):
+            for _ in range(2):
+                for recipe in (self.favorite, self.other):
+                    state.is_favorited(recipe)
+                    state.is_in_shopping_cart(recipe)
+                state.is_subscribed(self.author)
+        self.assertTrue(state.is_favorited(self.favorite))
+        self.assertFalse(state.is_favorited(self.other))
+        self.assertFalse(state.is_in_shopping_cart(self.favorite))
+        self.assertTrue(state.is_in_shopping_cart(self.other))
+        self.assertTrue(state.is_subscribed(self.author))
+        self.assertFalse(state.is_subscribed(self.user))
+
+    def test_anonymous_viewer_needs_no_queries(self):
+        state = ViewerState(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertFalse(state.is_favorited(self.favorite))
+            self.assertFalse(state.is_in_shopping_cart(self.other))
+            self.assertFalse(state.is_subscribed(self.author))
+
+    def test_state_is_shared_within_a_request(self):
+        first, second = RequestFactory().get('/'), RequestFactory().get('/')
+        first.user = second.user = self.user
+        self.assertIs(get_viewer_state(first), get_viewer_state(first))
+        self.assertIsNot(get_viewer_state(first), get_viewer_state(second))
@@ -2,6 +2,8 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
+from api.async_views import read_path
 from api.views import (
     ApiFavorite,
     ApiRecipe,
@@ -12,18 +14,27 @@ from api.views import (
     download_shopping_cart,
     IngredientDetail,
     IngredientList,
+    PantryRecipeList,
+    RecommendedRecipeList,
+    TimelineList,
     TagDetail,
     TagList,
     SubscriptionList,
 )
 
 recipes_urls = [
-    path('tags/', TagList.as_view()),
+    path('tags/', read_path(async_views.tag_list, TagList.as_view())),
     path('tags/<int:pk>/', TagDetail.as_view()),
-    path('ingredients/', IngredientList.as_view()),
+    path('ingredients/', read_path(
+        async_views.ingredient_list, IngredientList.as_view())),
     path('ingredients/<int:pk>/', IngredientDetail.as_view()),
-    path('recipes/', ApiRecipe.as_view()),
-    path('recipes/<int:pk>/', ApiRecipeDetail.as_view()),
+    path('recipes/', read_path(
+        async_views.recipe_list, ApiRecipe.as_view())),
+    path('recipes/pantry/', PantryRecipeList.as_view()),
+    path('recipes/recommended/', RecommendedRecipeList.as_view()),
+    path('recipes/feed/', TimelineList.as_view()),
+    path('recipes/<int:pk>/', read_path(
+        async_views.recipe_detail, ApiRecipeDetail.as_view())),
     path('recipes/<int:pk>/favorite/', ApiFavorite.as_view()),
     path('recipes/<int:pk>/shopping_cart/', ApiShoppingCart.as_view()),
     path('recipes/download_shopping_cart/',
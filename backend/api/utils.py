@@ -0,0 +1,59 @@
+from rest_framework.exceptions import ValidationError
+
+
+def get_int_param(request, name, default=None, min_value=0):
+    value = request.query_params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'A valid integer is required.'})
+    if value < min_value:
+        raise ValidationError(
+            {name: f'Ensure this value is greater than or equal to '
+                   f'{min_value}.'})
+    return value
+
+
+def get_int_list_param(request, name, min_value=1):
+    values = []
+    for value in request.query_params.getlist(name):
+        values.extend(item for item in value.split(',') if item.strip())
+    try:
+        values = [int(value) for value in values]
+    except ValueError:
+        raise ValidationError({name: 'A list of valid integers is required.'})
+    if any(value < min_value for value in values):
+        raise ValidationError(
+            {name: f'Ensure every value is greater than or equal to '
+                   f'{min_value}.'})
+    return values
+
+
+def get_view_attribute(view_func, method, name):
+    value = getattr(view_func, name, None)
+    view_class = getattr(view_func, 'cls', None)
+    if value is not None or view_class is None:
+        return value
+    actions = getattr(view_func, 'actions', None) or {}
+    handler = getattr(view_class, actions.get(method, method), None)
+    return getattr(handler, name, None)
+
+
+def accepts_encoding(request, coding):
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = (part.strip() for part in item.split(';'))
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get(coding, qualities.get('*', 0.0)) > 0
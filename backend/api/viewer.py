@@ -0,0 +1,46 @@
+from django.utils.functional import cached_property
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class ViewerState:
+    def __init__(self, user):
+        self.user = user
+
+    def _ids(self, model, lookup, field):
+        if self.user is None or not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(model.objects.filter(
+            **{lookup: self.user}).values_list(field, flat=True))
+
+    @cached_property
+    def favorite_ids(self):
+        return self._ids(Favorite, 'user', 'recipe_id')
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self._ids(ShoppingCart, 'user', 'recipe_id')
+
+    @cached_property
+    def subscription_ids(self):
+        return self._ids(Subscription, 'subscriber', 'author_id')
+
+    def is_favorited(self, recipe):
+        return recipe.pk in self.favorite_ids
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.pk in self.shopping_cart_ids
+
+    def is_subscribed(self, author):
+        return author.pk in self.subscription_ids
+
+
+def get_viewer_state(request):
+    if request is None:
+        return ViewerState(None)
+    viewer_state = getattr(request, '_viewer_state', None)
+    if viewer_state is None:
+        viewer_state = ViewerState(request.user)
+        request._viewer_state = viewer_state
+    return viewer_state
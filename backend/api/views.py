@@ -1,44 +1,77 @@
-from pathlib import Path
-
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Value
 from django.db.utils import IntegrityError
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 
 from djoser.views import UserViewSet
 
 from rest_framework import status, permissions, filters
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from api.pagination import CustomPageNumberPagination
+from api.caching import (
+    cached_recipe_list,
+    conditional,
+    recipe_validators,
+    request_versions,
+    table_validators,
+)
+from api.exports import EXPORTERS, shopping_list_rows
+from api.pagination import (
+    CustomPageNumberPagination,
+    RecipeCursorPagination,
+    SubscriptionCursorPagination,
+)
 from api.permissions import OnlyAuthor
+from api.profiling import query_budget
+from api.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from api.replicas import replica_reads
 from api.serializers import (
     CustomUserSerializer,
     IngredientSerializer,
+    PantryMatchSerializer,
     RecipeInfoSerializer,
     RecipeReadSerializer,
     RecipeSerializer,
     SubscriptionSerializer,
     TagSerializer
 )
+from api.utils import (
+    accepts_encoding,
+    get_int_list_param,
+    get_int_param,
+)
+from api.viewer import get_viewer_state
+from recipes import timeline, versions
+from recipes.ingredient_index import search_ingredients
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
     ShoppingCart,
     Tag
 )
+from recipes.pantry import pantry_index
+from recipes.recommendations import recommend
+from recipes.search import search_recipes
 from users.models import Subscription, User
 
 
 class TagList(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @replica_reads
+    @query_budget(3)
+    @conditional(table_validators(versions.TAGS))
     def get(self, request):
         tags = Tag.objects.all()
 
@@ -53,6 +86,9 @@ class TagList(APIView):
 class TagDetail(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @replica_reads
+    @query_budget(3)
+    @conditional(table_validators(versions.TAGS))
     def get(self, request, pk):
         current_tag = get_object_or_404(Tag, pk=pk)
 
@@ -66,12 +102,15 @@ class TagDetail(APIView):
 class IngredientList(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @replica_reads
+    @query_budget(2)
+    @conditional(table_validators(versions.INGREDIENTS))
     def get(self, request):
         name = self.request.query_params.get('name')
-        if name is not None:
-            ingredients = Ingredient.objects.filter(name__startswith=name)
-        else:
-            ingredients = Ingredient.objects.all()
+        limit = get_int_param(request, 'limit', min_value=1)
+        version = request_versions(request, versions.INGREDIENTS)
+        ingredients = search_ingredients(
+            name, limit, version[versions.INGREDIENTS].version)
 
         serializer = IngredientSerializer(
             ingredients,
@@ -84,6 +123,9 @@ class IngredientList(APIView):
 class IngredientDetail(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @replica_reads
+    @query_budget(3)
+    @conditional(table_validators(versions.INGREDIENTS))
     def get(self, request, pk):
         current_ingredient = get_object_or_404(Ingredient, pk=pk)
 
@@ -94,8 +136,41 @@ class IngredientDetail(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def filter_recipes(request, recipes):
+    is_favorited = request.query_params.get('is_favorited')
+    if is_favorited is not None:
+        is_favorited = int(is_favorited)
+        favorite_recipes = Favorite.objects.filter(
+            user=request.user).values_list('recipe', flat=True)
+        if is_favorited == 1:
+            recipes = recipes.filter(id__in=favorite_recipes)
+
+    is_in_shopping_cart = request.query_params.get('is_in_shopping_cart')
+    if is_in_shopping_cart is not None:
+        is_in_shopping_cart = int(is_in_shopping_cart)
+        shopping_cart_recipes = ShoppingCart.objects.filter(
+            user=request.user).values_list('recipe', flat=True)
+        if is_in_shopping_cart == 1:
+            recipes = recipes.filter(id__in=shopping_cart_recipes)
+
+    author = request.query_params.get('author')
+    if author is not None:
+        author = int(author)
+        recipes = recipes.filter(author_id=author)
+
+    tags = request.query_params.getlist('tags')
+    if len(tags):
+        recipes = recipes.filter(tags__slug__in=tags).distinct()
+
+    query = request.query_params.get('search', '').strip()
+    if query:
+        recipes = search_recipes(recipes, query)
+    return recipes
+
+
 class ApiRecipe(APIView, CustomPageNumberPagination):
     permission_classes = [permissions.IsAuthenticated]
+    cursor_pagination_class = RecipeCursorPagination
 
     def post(self, request):
         serializer = RecipeSerializer(
@@ -107,42 +182,30 @@ class ApiRecipe(APIView, CustomPageNumberPagination):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @replica_reads
+    @query_budget(8)
     def get(self, request):
-        recipes = Recipe.objects.all()
-
-        is_favorited = request.query_params.get('is_favorited')
-        if is_favorited is not None:
-            is_favorited = int(is_favorited)
-            favorite_recipes = Favorite.objects.filter(
-                user=request.user).values_list('recipe', flat=True)
-            if is_favorited == 1:
-                recipes = recipes.filter(id__in=favorite_recipes)
-
-        is_in_shopping_cart = request.query_params.get('is_in_shopping_cart')
-        if is_in_shopping_cart is not None:
-            is_in_shopping_cart = int(is_in_shopping_cart)
-            shopping_cart_recipes = ShoppingCart.objects.filter(
-                user=request.user).values_list('recipe', flat=True)
-            if is_in_shopping_cart == 1:
-                recipes = recipes.filter(id__in=shopping_cart_recipes)
-
-        author = request.query_params.get('author')
-        if author is not None:
-            author = int(author)
-            recipes = recipes.filter(author_id=author)
-
-        tags = self.request.query_params.getlist('tags')
-        if len(tags):
-            recipes = recipes.filter(tags__slug__in=tags).distinct()
-
-        results = self.paginate_queryset(recipes, request, view=self)
+        data = cached_recipe_list(
+            request, lambda: self.list_recipes(request))
+        return Response(data, status=status.HTTP_200_OK)
+
+    def list_recipes(self, request):
+        recipes = filter_recipes(
+            request,
+            Recipe.objects.with_related().with_user_flags(request.user))
+
+        if request.query_params.get('search', '').strip():
+            paginator = self
+        else:
+            paginator = self.get_paginator(request)
+        results = paginator.paginate_queryset(recipes, request, view=self)
 
         serializer = RecipeReadSerializer(
             results,
             many=True,
             context={'request': request})
 
-        return self.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serializer.data).data
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -150,11 +213,112 @@ class ApiRecipe(APIView, CustomPageNumberPagination):
         return super().get_permissions()
 
 
+class PantryRecipeList(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @query_budget(6)
+    @conditional(table_validators(versions.RECIPES))
+    def get(self, request):
+        pantry = get_int_list_param(request, 'ingredients')
+        if not pantry:
+            raise ValidationError(
+                {'ingredients': 'This query parameter is required.'})
+        limit = min(get_int_param(request, 'limit', 20, min_value=1),
+                    settings.PANTRY_MAX_RESULTS)
+        min_coverage = get_int_param(request, 'min_coverage', 0) / 100
+        version = request_versions(request, versions.RECIPES)
+
+        matches = pantry_index.match(
+            pantry, limit, min_coverage, version[versions.RECIPES].version)
+        recipes = Recipe.objects.in_bulk(
+            [match['recipe_id'] for match in matches])
+        ingredients = Ingredient.objects.in_bulk(
+            {pk for match in matches for pk in match['missing']})
+        results = [
+            dict(match,
+                 recipe=recipes[match['recipe_id']],
+                 missing=[ingredients[pk] for pk in match['missing']
+                          if pk in ingredients])
+            for match in matches if match['recipe_id'] in recipes
+        ]
+
+        serializer = PantryMatchSerializer(
+            results,
+            many=True,
+            context={'request': request})
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class RecommendedRecipeList(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @query_budget(9)
+    def get(self, request):
+        limit = min(get_int_param(request, 'limit', 20, min_value=1),
+                    settings.RECOMMENDATION_MAX_RESULTS)
+        viewer_state = get_viewer_state(request)
+        ranked = recommend(
+            request.user,
+            viewer_state.favorite_ids,
+            viewer_state.subscription_ids,
+            limit)
+        recipes = Recipe.objects.with_related().with_user_flags(
+            request.user).filter(pk__in=ranked).exclude(author=request.user)
+        recipes = {recipe.pk: recipe for recipe in recipes}
+        results = [recipes[pk] for pk in ranked if pk in recipes][:limit]
+
+        serializer = RecipeReadSerializer(
+            results,
+            many=True,
+            context={'request': request})
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TimelineList(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @query_budget(6)
+    def get(self, request):
+        limit = min(get_int_param(request, 'limit', 10, min_value=1),
+                    settings.TIMELINE_MAX_PAGE_SIZE)
+        cursor = request.query_params.get('cursor')
+        try:
+            position = timeline.decode_cursor(cursor) if cursor else None
+        except (TypeError, ValueError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+        entries = timeline.timeline(request.user, position, limit)
+        recipes = Recipe.objects.with_related().with_user_flags(
+            request.user).in_bulk([recipe_id for _, recipe_id in entries])
+        results = [recipes[recipe_id] for _, recipe_id in entries
+                   if recipe_id in recipes]
+
+        next_url = None
+        if len(entries) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                timeline.encode_cursor(*entries[-1]))
+        serializer = RecipeReadSerializer(
+            results,
+            many=True,
+            context={'request': request})
+
+        return Response({'next': next_url, 'results': serializer.data},
+                        status=status.HTTP_200_OK)
+
+
 class ApiRecipeDetail(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @replica_reads
+    @query_budget(6)
+    @conditional(recipe_validators)
     def get(self, request, pk):
-        current_recipe = get_object_or_404(Recipe, pk=pk)
+        current_recipe = get_object_or_404(
+            Recipe.objects.with_related().with_user_flags(request.user),
+            pk=pk)
 
         serializer = RecipeReadSerializer(
             current_recipe,
@@ -230,9 +394,10 @@ class ApiShoppingCart(APIView):
         current_recipe = get_object_or_404(Recipe, pk=pk)
 
         try:
-            ShoppingCart.objects.create(
-                user=request.user,
-                recipe=current_recipe)
+            with transaction.atomic():
+                ShoppingCart.objects.create(
+                    user=request.user,
+                    recipe=current_recipe)
 
         except IntegrityError:
             return Response(
@@ -249,10 +414,11 @@ class ApiShoppingCart(APIView):
         current_recipe = get_object_or_404(Recipe, pk=pk)
 
         try:
-            shoppingcart = ShoppingCart.objects.get(
-                user=request.user,
-                recipe=current_recipe)
-            shoppingcart.delete()
+            with transaction.atomic():
+                shoppingcart = ShoppingCart.objects.get(
+                    user=request.user,
+                    recipe=current_recipe)
+                shoppingcart.delete()
 
         except ObjectDoesNotExist:
             return Response({'error': 'Recipe not found in shopping cart'},
@@ -261,29 +427,36 @@ class ApiShoppingCart(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@query_budget(2)
 @api_view(['GET'])
+@renderer_classes([PlainTextRenderer, CSVRenderer, JSONRenderer, PDFRenderer])
 def download_shopping_cart(request):
-    file_path = Path(settings.MEDIA_ROOT,
-                     'shopping_cart.txt')
-
-    user_shopping_cart = RecipeIngredient.objects.select_related(
-            'recipe', 'ingredient').filter(
-        recipe__shoppingcarts__user=request.user).values_list(
-            'ingredient__name', 'ingredient__measurement_unit', 'amount')
-    all_count_ingredients = user_shopping_cart.values(
-        'ingredient__name', 'ingredient__measurement_unit').annotate(
-            total=Sum('amount')).order_by('-total')
-
-    with open(file_path, 'w', encoding='utf-8') as file:
-        for ingredient in all_count_ingredients:
-            file.write(
-                f'{ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]}) - '
-                f'{ingredient["total"]}\n')
-
-    FilePointer = open(file_path, 'r', encoding='utf-8')
-    response = HttpResponse(FilePointer, content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename=shopping_cart.txt'
+    renderer = request.accepted_renderer
+    exporter = EXPORTERS[renderer.format]
+    try:
+        chunks = exporter(shopping_list_rows(request.user))
+    except NotAcceptable:
+        request.accepted_renderer = JSONRenderer()
+        request.accepted_media_type = JSONRenderer.media_type
+        raise
+    content = (
+        chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        for chunk in chunks
+    )
+
+    gzipped = accepts_encoding(request, 'gzip')
+    if gzipped:
+        content = compress_sequence(content)
+
+    content_type = renderer.media_type
+    if renderer.render_style != 'binary':
+        content_type = f'{content_type}; charset=utf-8'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename=shopping_cart.{renderer.format}')
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
 
     return response
 
@@ -301,20 +474,36 @@ class CustomUserViewSet(UserViewSet):
 
 
 class SubscriptionList(APIView, CustomPageNumberPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
+
+    @replica_reads
+    @query_budget(4)
     def get(self, request):
-        authors = User.objects.filter(authors__subscriber=request.user)
-        results = self.paginate_queryset(authors, request, view=self)
+        recipes_limit = get_int_param(request, 'recipes_limit')
+        authors = User.objects.filter(
+            authors__subscriber=request.user).select_related(
+                'stats').annotate(is_subscribed=Value(True)).order_by('id')
+        paginator = self.get_paginator(request)
+        results = paginator.paginate_queryset(authors, request, view=self)
+
+        latest_recipes = {author.pk: [] for author in results}
+        for recipe in Recipe.objects.latest_per_author(
+                latest_recipes, recipes_limit).defer('search_vector'):
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in results:
+            author.latest_recipes = latest_recipes[author.pk]
 
         serializer = SubscriptionSerializer(
             results,
             many=True,
             context={'request': request})
 
-        return self.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class ApiSubscription(APIView):
     def post(self, request, pk):
+        recipes_limit = get_int_param(request, 'recipes_limit')
         author = get_object_or_404(User, pk=pk)
         if author == self.request.user:
             return Response({'errors': 'You can\'t subscribe to yourself'},
@@ -329,8 +518,12 @@ class ApiSubscription(APIView):
                 {'errors': 'You can\'t subscribe to the author twice'},
                 status=status.HTTP_400_BAD_REQUEST)
 
+        author = subscription.author
+        author.is_subscribed = True
+        author.latest_recipes = Recipe.objects.latest_per_author(
+            [author.pk], recipes_limit).defer('search_vector')
         serializer = SubscriptionSerializer(
-            subscription.author,
+            author,
             context={'request': request})
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -33,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.replicas.ReplicaRoutingMiddleware',
+    'api.profiling.QueryBudgetMiddleware',
+    'api.caching.VersionBatchMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,10 +72,62 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': not os.getenv('DB_DISABLE_HEALTH_CHECKS'),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS')),
     }
 }
 
+DB_HEALTH_CHECK_INTERVAL = int(os.getenv('DB_HEALTH_CHECK_INTERVAL', 10))
+
+REPLICA_DATABASES = []
+for number, replica in enumerate(filter(
+        None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{number}'
+    host, _, port = replica.strip().partition(':')
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host,
+        PORT=port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'})
+    if DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        DATABASES[alias]['OPTIONS'] = {'connect_timeout': int(
+            os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2))}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = int(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 15))
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+RECIPES_CACHE_BACKENDS = {
+    'locmem': 'api.cache_backends.BoundedLocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+RECIPES_CACHE_BACKEND = os.getenv('RECIPES_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': RECIPES_CACHE_BACKENDS.get(
+            RECIPES_CACHE_BACKEND, RECIPES_CACHE_BACKEND),
+        'LOCATION': os.getenv('RECIPES_CACHE_LOCATION', 'recipes'),
+        'TIMEOUT': int(os.getenv('RECIPES_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RECIPES_CACHE_MAX_ENTRIES', 1000)),
+            'MAX_BYTES': int(os.getenv('RECIPES_CACHE_MAX_BYTES', 32 << 20)),
+        },
+    },
+}
+
+RECIPES_CACHE_LOCK_TIMEOUT = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -126,5 +181,60 @@ STATIC_ROOT = Path(BASE_DIR, 'static')
 
 MEDIA_URL = '/media_backend/'
 MEDIA_ROOT = Path(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+MEDIA_GC_GRACE_PERIOD = int(os.getenv('MEDIA_GC_GRACE_PERIOD', 3600))
+
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE', 5 << 20))
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + (256 << 10)
+RECIPE_IMAGE_FORMAT = os.getenv('RECIPE_IMAGE_FORMAT', 'WEBP')
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 80))
+RECIPE_IMAGE_QUEUE = {
+    'BACKEND': os.getenv(
+        'RECIPE_IMAGE_QUEUE', 'recipes.images.ThreadPoolQueue'),
+    'OPTIONS': {
+        'max_workers': int(os.getenv('RECIPE_IMAGE_WORKERS', 2)),
+    },
+}
+
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 60))
+ASYNC_READ_VIEWS = bool(os.getenv('ASYNC_READ_VIEWS'))
+
+INGREDIENT_SEARCH_BACKEND = os.getenv('INGREDIENT_SEARCH_BACKEND', 'memory')
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+RECIPE_SEARCH_MAX_RESULTS = int(os.getenv('RECIPE_SEARCH_MAX_RESULTS', 500))
+
+PANTRY_INDEX_OVERLAP = int(os.getenv('PANTRY_INDEX_OVERLAP', 60))
+PANTRY_MAX_RESULTS = 100
+
+RECOMMENDATION_WEIGHTS = {
+    'favorites': 0.6,
+    'ingredients': 0.3,
+    'tags': 0.1,
+}
+RECOMMENDATION_TOP_K = 20
+RECOMMENDATION_MAX_DF = 0.05
+RECOMMENDATION_MAX_DF_FLOOR = 50
+RECOMMENDATION_SUBSCRIPTION_WEIGHT = 0.5
+RECOMMENDATION_MAX_RESULTS = 100
+
+TIMELINE_FANOUT_THRESHOLD = int(
+    os.getenv('TIMELINE_FANOUT_THRESHOLD', 5000))
+TIMELINE_BACKFILL = 50
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_MAX_PAGE_SIZE = 100
+
+QUERY_PROFILING = {
+    'ENABLED': bool(os.getenv('QUERY_PROFILING')),
+    'STRICT': bool(os.getenv('QUERY_BUDGET_STRICT')),
+    'REPORT_DIR': os.getenv(
+        'QUERY_PROFILING_DIR', Path(BASE_DIR, 'profiling')),
+    'FLUSH_INTERVAL': int(os.getenv('QUERY_PROFILING_FLUSH_INTERVAL', 30)),
+}
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,30 @@
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+from foodgram.settings import QUERY_PROFILING
+
+SECRET_KEY = 'test'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'CONN_MAX_AGE': 0,
+    },
+}
+DATABASES['replica_0'] = dict(
+    DATABASES['default'], TEST={'MIRROR': 'default'})
+REPLICA_DATABASES = []
+
+MIGRATION_MODULES = {'api': None, 'recipes': None, 'users': None}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
+
+RECIPE_IMAGE_QUEUE = {
+    'BACKEND': 'recipes.images.SynchronousQueue',
+    'OPTIONS': {},
+}
+
+QUERY_PROFILING = dict(QUERY_PROFILING, ENABLED=False)
@@ -1,12 +1,15 @@
 from django.contrib import admin
 
+from recipes import shopping_list
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
+    RecipeNeighbor,
     RecipeTag,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 
@@ -32,10 +35,20 @@ class RecipeAdmin(admin.ModelAdmin):
 
     list_display = ('id', 'name', 'author', 'is_favorite_count')
     list_filter = ('author', 'name', 'tags')
-
-    @admin.display(description='is_favorite_count')
+    list_select_related = ('author',)
+
+    def save_related(self, request, form, formsets, change):
+        old_amounts = shopping_list.recipe_amounts(form.instance)
+        super().save_related(request, form, formsets, change)
+        shopping_list.update_recipe(
+            form.instance,
+            old_amounts,
+            shopping_list.recipe_amounts(form.instance))
+
+    @admin.display(description='is_favorite_count',
+                   ordering='favorites_count')
     def is_favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 class RecipeTagAdmin(admin.ModelAdmin):
@@ -54,6 +67,16 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
 
 
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'ingredient', 'amount')
+    list_select_related = ('user', 'ingredient')
+
+
+class RecipeNeighborAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipe', 'neighbor', 'score')
+    list_select_related = ('recipe', 'neighbor')
+
+
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeTag, RecipeTagAdmin)
@@ -61,3 +84,5 @@ admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
+admin.site.register(RecipeNeighbor, RecipeNeighborAdmin)
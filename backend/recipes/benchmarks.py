@@ -0,0 +1,19 @@
+import math
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (
+        position - lower)
+
+
+def summarize(timings):
+    return ', '.join(
+        f'{name} {percentile(timings, fraction) * 1000:.1f}ms'
+        for name, fraction in (
+            ('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0)))
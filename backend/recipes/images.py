@@ -0,0 +1,166 @@
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from PIL import Image, ImageOps
+
+from recipes import versions
+from recipes.models import Recipe
+from recipes.storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+
+EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+MODES = {
+    'WEBP': ('RGB', 'RGBA'),
+    'JPEG': ('RGB', 'L'),
+}
+
+
+class SynchronousQueue:
+    def __init__(self, **options):
+        pass
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolQueue:
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='recipe-images')
+
+    def submit(self, func, *args):
+        self.executor.submit(self.run, func, *args)
+
+    def run(self, func, *args):
+        try:
+            func(*args)
+        finally:
+            connections.close_all()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            backend = import_string(settings.RECIPE_IMAGE_QUEUE['BACKEND'])
+            _queue = backend(**settings.RECIPE_IMAGE_QUEUE.get('OPTIONS', {}))
+    return _queue
+
+
+def variant_names(recipe):
+    return [path for name, path in (recipe.image_variants or {}).items()
+            if name in VARIANTS]
+
+
+def stored_names(recipe):
+    names = variant_names(recipe)
+    if recipe.image:
+        names.append(recipe.image.name)
+    return names
+
+
+def reference_count(name):
+    references = Q(image=name)
+    for variant in VARIANTS:
+        references |= Q(**{f'image_variants__{variant}': name})
+    return Recipe.objects.filter(references).count()
+
+
+def release(names):
+    for name in set(names):
+        try:
+            age = time.time() - os.path.getmtime(default_storage.path(name))
+        except OSError:
+            continue
+        if age > settings.MEDIA_GC_GRACE_PERIOD and not reference_count(name):
+            default_storage.delete(name)
+
+
+def release_on_commit(names):
+    if names:
+        transaction.on_commit(lambda: release(names))
+
+
+def upload_name(recipe):
+    storage = recipe.image.storage
+    if not isinstance(storage, ContentAddressedStorage):
+        return None
+    name = recipe.image.field.generate_filename(recipe, recipe.image.name)
+    return storage.hashed_name(name, storage.digest(recipe.image.file))
+
+
+def needs_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name)
+
+
+def schedule_variants(recipe):
+    recipe_id, source = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: get_queue().submit(render_variants, recipe_id, source))
+
+
+def build_variants(source):
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    root = os.path.splitext(source)[0]
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        image.draft('RGB', VARIANTS['full'])
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in MODES[image_format]:
+        image = image.convert(MODES[image_format][0])
+
+    variants = {'source': source}
+    for name, size in VARIANTS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size)
+        buffer = io.BytesIO()
+        rendition.save(
+            buffer, image_format, quality=settings.RECIPE_IMAGE_QUALITY)
+        variants[name] = default_storage.save(
+            f'{root}_{name}.{EXTENSIONS[image_format]}',
+            ContentFile(buffer.getvalue()))
+    return variants
+
+
+def render_variants(recipe_id, source):
+    try:
+        variants = build_variants(source)
+    except Exception:
+        logger.exception('Failed to render variants of %s', source)
+        return None
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=source).update(
+            image_variants=variants, updated_at=timezone.now())
+    if not updated:
+        return None
+    versions.bump_on_commit(versions.RECIPES)
+    return variants
@@ -0,0 +1,128 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from recipes.models import Ingredient
+
+GRAM_SIZE = 3
+
+
+def grams(value, size):
+    return {value[start:start + size]
+            for start in range(len(value) - size + 1)}
+
+
+class IngredientIndex:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = None
+        self._entries = None
+        self._postings = None
+        self._built_at = None
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._entries = None
+            self._postings = None
+
+    def _expired(self, version):
+        if self._entries is None:
+            return True
+        if version is not None:
+            return version != self._version
+        return (self.ttl is not None
+                and time.monotonic() - self._built_at > self.ttl)
+
+    def _load(self, version=None):
+        with self._lock:
+            if self._expired(version):
+                entries = sorted(
+                    ({'id': pk, 'name': name,
+                      'measurement_unit': measurement_unit}
+                     for pk, name, measurement_unit
+                     in Ingredient.objects.order_by().values_list(
+                         'id', 'name', 'measurement_unit')),
+                    key=lambda entry: (entry['name'].casefold(), entry['id']))
+                keys = [entry['name'].casefold() for entry in entries]
+                postings = defaultdict(list)
+                for position, key in enumerate(keys):
+                    for size in range(1, GRAM_SIZE + 1):
+                        for gram in grams(key, size):
+                            postings[gram].append(position)
+                self._keys = keys
+                self._entries = entries
+                self._postings = dict(postings)
+                self._built_at = time.monotonic()
+                self._version = version
+            return self._keys, self._entries, self._postings
+
+    def all(self, limit=None, version=None):
+        _, entries, _ = self._load(version)
+        return entries[:limit]
+
+    def _containing(self, keys, postings, query):
+        if len(query) <= GRAM_SIZE:
+            return postings.get(query, [])
+        lists = sorted(
+            (postings.get(gram, []) for gram in grams(query, GRAM_SIZE)),
+            key=len)
+        positions = set(lists[0])
+        for other in lists[1:]:
+            positions.intersection_update(other)
+            if not positions:
+                return []
+        return sorted(
+            position for position in positions if query in keys[position])
+
+    def search(self, query, limit=None, version=None):
+        keys, entries, postings = self._load(version)
+        query = query.casefold()
+        if not query:
+            return entries[:limit]
+
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = entries[start:end]
+
+        for position in self._containing(keys, postings, query):
+            if limit is not None and len(results) >= limit:
+                break
+            if not start <= position < end:
+                results.append(entries[position])
+        return results[:limit]
+
+
+def search_database(query, limit=None):
+    query = query.lower()
+    ingredients = Ingredient.objects.annotate(
+        name_lower=Lower('name')).filter(
+            name_lower__contains=query).annotate(
+                is_contains=Case(
+                    When(name_lower__startswith=query, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField())).order_by(
+                        'is_contains', 'name_lower', 'id')
+    return ingredients[:limit]
+
+
+ingredient_index = IngredientIndex(ttl=settings.INGREDIENT_INDEX_TTL)
+
+
+def search_ingredients(query=None, limit=None, version=None):
+    if settings.INGREDIENT_SEARCH_BACKEND == 'database':
+        if query is None:
+            return Ingredient.objects.all()[:limit]
+        return search_database(query, limit)
+    if query is None:
+        return ingredient_index.all(limit, version)
+    return ingredient_index.search(query, limit, version)
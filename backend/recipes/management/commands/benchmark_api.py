@@ -0,0 +1,273 @@
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.benchmarks import percentile
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def endpoints(rng, recipe_ids, tag_slugs, ingredients):
+    ingredient_ids = [pk for pk, _ in ingredients]
+    names = [name for _, name in ingredients]
+
+    def recipe():
+        return f'/api/recipes/{rng.choice(recipe_ids)}/', {}
+
+    def search():
+        return '/api/recipes/', {'search': rng.choice(names)}
+
+    def pantry():
+        pantry = rng.sample(ingredient_ids, min(5, len(ingredient_ids)))
+        return '/api/recipes/pantry/', {
+            'ingredients': ','.join(map(str, pantry))}
+
+    def by_tag():
+        return '/api/recipes/', {'tags': rng.choice(tag_slugs)}
+
+    def ingredient_search():
+        return '/api/ingredients/', {'name': rng.choice(names)[:3]}
+
+    return {
+        'tags': lambda: ('/api/tags/', {}),
+        'ingredients': ingredient_search,
+        'recipes': lambda: ('/api/recipes/', {}),
+        'recipes_anonymous': lambda: ('/api/recipes/', {}),
+        'recipes_by_tag': by_tag,
+        'recipes_favorited': lambda: ('/api/recipes/', {'is_favorited': 1}),
+        'recipes_search': search,
+        'recipe': recipe,
+        'pantry': pantry,
+        'recommended': lambda: ('/api/recipes/recommended/', {}),
+        'feed': lambda: ('/api/recipes/feed/', {}),
+        'subscriptions': lambda: (
+            '/api/users/subscriptions/', {'recipes_limit': 3}),
+        'me': lambda: ('/api/users/me/', {}),
+        'shopping_cart': lambda: (
+            '/api/recipes/download_shopping_cart/', {}),
+    }
+
+
+class ClientTransport:
+    def __init__(self):
+        self.local = threading.local()
+
+    def get(self, path, params, token):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = APIClient()
+        client.credentials(
+            **({'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}))
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = client.get(path, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class ServerTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path, params, token):
+        url = f'{self.base_url}{path}'
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        request = urllib.request.Request(url)
+        if token:
+            request.add_header('Authorization', f'Token {token}')
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as error:
+            status, headers = error.code, error.headers
+        match = SERVER_TIMING_QUERIES.search(
+            headers.get('Server-Timing', ''))
+        return status, int(match.group(1)) if match else None
+
+    def close(self):
+        pass
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Drive the main API endpoints with concurrent requests and '
+            'record throughput, latency percentiles and queries.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Endpoint to run, all by default.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--users', type=int, default=50,
+                            help='Number of users to authenticate as.')
+        parser.add_argument('--url', help='Benchmark a running server '
+                                          'instead of the test client.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write JSON results here.')
+        parser.add_argument('--compare', help='Previous JSON results.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        users = list(User.objects.filter(is_active=True).order_by(
+            'id').values_list('id', flat=True))
+        if not (recipe_ids and tag_slugs and ingredients and users):
+            raise CommandError('Generate a dataset with generate_dataset')
+        tokens = [
+            Token.objects.get_or_create(user_id=user_id)[0].key
+            for user_id in rng.sample(users, min(options['users'], len(users)))
+        ]
+
+        available = endpoints(rng, recipe_ids, tag_slugs, ingredients)
+        names = options['endpoints'] or list(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(unknown)}')
+        transport = (ServerTransport(options['url']) if options['url']
+                     else ClientTransport())
+
+        results = {}
+        for name in names:
+            results[name] = self.run(
+                transport, available[name],
+                None if name.endswith('_anonymous') else tokens,
+                rng, options)
+            self.write_result(name, results[name])
+
+        report = {
+            'commit': git_commit(),
+            'created': timezone.now().isoformat(),
+            'mode': 'server' if options['url'] else 'client',
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': len(recipe_ids),
+                'tags': len(tag_slugs),
+                'ingredients': len(ingredients),
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.compare(json.load(previous), report)
+
+    def run(self, transport, endpoint, tokens, rng, options):
+        plan = [
+            (*endpoint(), rng.choice(tokens) if tokens else None)
+            for _ in range(options['warmup'] + options['requests'])
+        ]
+        for path, params, token in plan[:options['warmup']]:
+            transport.get(path, params, token)
+        pending = deque(plan[options['warmup']:])
+        samples = []
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        path, params, token = pending.popleft()
+                    except IndexError:
+                        return
+                    started = time.perf_counter()
+                    status, count = transport.get(path, params, token)
+                    samples.append(
+                        (time.perf_counter() - started, status, count))
+            finally:
+                transport.close()
+
+        workers = [threading.Thread(target=worker)
+                   for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        timings = [elapsed for elapsed, _, _ in samples]
+        queries = [count for _, _, count in samples if count is not None]
+        errors = sum(status >= 400 for _, status, _ in samples)
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'throughput': len(timings) / wall if wall else 0,
+            'p50_ms': percentile(timings, 0.5) * 1000,
+            'p95_ms': percentile(timings, 0.95) * 1000,
+            'p99_ms': percentile(timings, 0.99) * 1000,
+            'max_ms': percentile(timings, 1.0) * 1000,
+            'mean_queries': sum(queries) / len(queries) if queries else None,
+            'max_queries': max(queries) if queries else None,
+        }
+
+    def write_result(self, name, result):
+        queries = ('' if result['mean_queries'] is None else
+                   f', queries mean {result["mean_queries"]:.1f} '
+                   f'max {result["max_queries"]}')
+        line = (f'{name}: {result["throughput"]:.1f} req/s, '
+                f'p50 {result["p50_ms"]:.1f}ms p95 {result["p95_ms"]:.1f}ms '
+                f'p99 {result["p99_ms"]:.1f}ms{queries}')
+        if result['errors']:
+            self.stdout.write(self.style.ERROR(
+                f'{line}, {result["errors"]} errors'))
+        else:
+            self.stdout.write(line)
+
+    def compare(self, previous, current):
+        self.stdout.write(
+            f'Compared with {previous.get("commit") or "previous run"}:')
+        for name, result in current['endpoints'].items():
+            before = previous['endpoints'].get(name)
+            if before is None:
+                continue
+            changes = []
+            for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms',
+                           'mean_queries'):
+                if before[metric] and result[metric] is not None:
+                    change = result[metric] / before[metric] - 1
+                    changes.append(f'{metric} {change:+.0%}')
+            self.stdout.write(f'  {name}: {", ".join(changes)}')
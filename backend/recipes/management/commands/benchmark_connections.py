@@ -0,0 +1,90 @@
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, override_settings
+
+from recipes.benchmarks import percentile, summarize
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Measure connection setup cost and request latency with '
+            'per-request, persistent and health checked connections.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Request path, /api/tags/ and '
+                                 '/api/recipes/ by default.')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--connects', type=int, default=50)
+        parser.add_argument('--max-age', type=int, default=60)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/tags/', '/api/recipes/']
+        connects = []
+        for _ in range(options['connects']):
+            connection.close()
+            started = time.perf_counter()
+            connection.ensure_connection()
+            connects.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'Connection setup ({connection.vendor}): {summarize(connects)}')
+
+        handler = WSGIHandler()
+        settings_dict = connection.settings_dict
+        original = (settings_dict['CONN_MAX_AGE'],
+                    settings_dict.get('CONN_HEALTH_CHECKS'))
+        results = {}
+        try:
+            for mode, max_age, health_checks in (
+                    ('per request', 0, False),
+                    ('persistent', options['max_age'], False),
+                    ('health checked', options['max_age'], True)):
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                with override_settings(DB_HEALTH_CHECK_INTERVAL=0):
+                    results[mode] = self.run(
+                        handler, paths, options['requests'])
+        finally:
+            connection.close()
+            (settings_dict['CONN_MAX_AGE'],
+             settings_dict['CONN_HEALTH_CHECKS']) = original
+
+        baseline = percentile(results['per request'][1], 0.5)
+        for mode, (opened, timings) in results.items():
+            saved = baseline - percentile(timings, 0.5)
+            self.stdout.write(
+                f'{mode}: {opened} connections, {summarize(timings)}, '
+                f'p50 saved {saved * 1000:.1f}ms')
+
+    def run(self, handler, paths, requests):
+        factory = RequestFactory()
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection.close()
+        connection_created.connect(count)
+        timings = []
+        try:
+            for number in range(requests):
+                environ = factory.get(paths[number % len(paths)]).environ
+                started = time.perf_counter()
+                response = handler(environ, start_response)
+                b''.join(response)
+                response.close()
+                timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{environ["PATH_INFO"]} returned '
+                        f'{response.status_code}')
+        finally:
+            connection_created.disconnect(count)
+        return len(opened), timings
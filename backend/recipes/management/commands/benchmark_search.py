@@ -0,0 +1,105 @@
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import search
+from recipes.benchmarks import summarize
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+SYLLABLES = ('ка', 'ро', 'ми', 'на', 'ле', 'ту', 'со', 'па', 'ги', 'вы')
+
+
+class Command(BaseCommand):
+    help = ('Benchmark recipe search on synthetic recipes '
+            'inside a rolled back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = list({
+            ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+            for _ in range(5000)
+        })
+        cum_weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+        def words(count):
+            return ' '.join(
+                rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.populate(rng, words, options)
+            self.stdout.write(
+                f'Inserted {options["recipes"]} recipes in '
+                f'{time.perf_counter() - started:.1f}s')
+
+            started = time.perf_counter()
+            search.recipe_index.invalidate()
+            if search.uses_postgres():
+                search.refresh(Recipe.objects.values('id'))
+            else:
+                search.recipe_index.warm(search.index_version())
+            self.stdout.write(
+                f'Indexed in {time.perf_counter() - started:.1f}s')
+
+            ingredient_names = list(
+                Ingredient.objects.values_list('name', flat=True)[:500])
+            timings, matches = [], []
+            for _ in range(options['queries']):
+                query = words(rng.randint(1, 2))
+                if ingredient_names and rng.random() < 0.3:
+                    query = rng.choice(ingredient_names)
+                started = time.perf_counter()
+                results = search.search_recipes(Recipe.objects.all(), query)
+                page = list(results.values_list(
+                    'id', flat=True)[:options['page_size']])
+                timings.append(time.perf_counter() - started)
+                matches.append(len(page))
+            transaction.set_rollback(True)
+        search.recipe_index.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings)} queries: {summarize(timings)}, '
+            f'empty pages {matches.count(0)}'))
+
+    def populate(self, rng, words, options):
+        author = User.objects.create_user(
+            username='benchmark_search', email='benchmark_search@example.com')
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredients:
+            names = set()
+            while len(names) < 1000:
+                names.add(words(2))
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit='г')
+                for name in sorted(names))
+            ingredients = list(
+                Ingredient.objects.values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, options['recipes'], batch_size):
+            stop = min(start + batch_size, options['recipes'])
+            recipes = Recipe.objects.bulk_create(
+                Recipe(author=author, name=f'{words(3)} {number}',
+                       text=words(40), image='benchmark.png',
+                       cooking_time=rng.randint(1, 180))
+                for number in range(start, stop))
+            if not all(recipe.pk for recipe in recipes):
+                recipes = Recipe.objects.filter(
+                    author=author).order_by('-id')[:stop - start]
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe_id=recipe.pk, ingredient_id=pk,
+                                 amount=rng.randint(1, 500))
+                for recipe in recipes
+                for pk in rng.sample(ingredients, min(5, len(ingredients))))
@@ -0,0 +1,100 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipes import timeline
+from recipes.benchmarks import summarize
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User, UserStats
+
+
+class Command(BaseCommand):
+    help = ('Compare fan-out-on-write and fan-out-on-read timelines '
+            'inside a rolled back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=10000)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--following', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=20,
+                            help='Recipes per author.')
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            authors, followers, recipes = self.populate(rng, options)
+            readers = rng.sample(followers, min(options['reads'],
+                                                len(followers)))
+
+            started = time.perf_counter()
+            writes = []
+            for recipe in recipes:
+                write_started = time.perf_counter()
+                timeline.fan_out(recipe, threshold=len(followers))
+                writes.append(time.perf_counter() - write_started)
+            self.stdout.write(
+                f'Fan-out on write: {FeedEntry.objects.count()} entries in '
+                f'{time.perf_counter() - started:.1f}s, '
+                f'per recipe {summarize(writes)}')
+
+            for name, threshold in (('push', len(followers)), ('pull', -1)):
+                if name == 'pull':
+                    FeedEntry.objects.filter(user__in=followers).delete()
+                reads = []
+                for reader in readers:
+                    read_started = time.perf_counter()
+                    timeline.timeline(
+                        reader, limit=options['page_size'],
+                        threshold=threshold)
+                    reads.append(time.perf_counter() - read_started)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Read ({name}): {summarize(reads)}'))
+            transaction.set_rollback(True)
+
+    def populate(self, rng, options):
+        password = make_password(None)
+        User.objects.bulk_create(
+            User(username=f'benchmark_timeline_{number}',
+                 email=f'benchmark_timeline_{number}@example.com',
+                 password=password)
+            for number in range(options['authors'] + options['followers']))
+        users = list(User.objects.filter(
+            username__startswith='benchmark_timeline_').order_by('id'))
+        authors = users[:options['authors']]
+        followers = users[options['authors']:]
+
+        subscriptions = [
+            Subscription(subscriber=follower, author=author)
+            for follower in followers
+            for author in rng.sample(
+                authors, min(options['following'], len(authors)))
+        ]
+        Subscription.objects.bulk_create(subscriptions, batch_size=5000)
+        counts = {}
+        for subscription in subscriptions:
+            counts[subscription.author_id] = counts.get(
+                subscription.author_id, 0) + 1
+        UserStats.objects.bulk_create(
+            UserStats(user_id=author_id, subscribers_count=count)
+            for author_id, count in counts.items())
+
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'benchmark_timeline {author.pk} '
+                                       f'{number}',
+                   text='', image='benchmark.png', cooking_time=1)
+            for author in authors for number in range(options['recipes']))
+        recipes = list(Recipe.objects.filter(
+            name__startswith='benchmark_timeline ').order_by('id'))
+        for position, recipe in enumerate(recipes):
+            recipe.pub_date = now - timedelta(minutes=position)
+        Recipe.objects.bulk_update(recipes, ['pub_date'], batch_size=1000)
+        return authors, followers, recipes
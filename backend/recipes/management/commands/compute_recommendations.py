@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import compute_neighbors
+
+
+class Command(BaseCommand):
+    help = 'Compute top-K similar recipes for recommendations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int,
+                            default=settings.RECOMMENDATION_TOP_K)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--max-df', type=float,
+                            default=settings.RECOMMENDATION_MAX_DF)
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{done}/{total} recipes')
+
+        stored = compute_neighbors(
+            options['top_k'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            max_df=options['max_df'],
+            progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recipe neighbours stored: {stored}'))
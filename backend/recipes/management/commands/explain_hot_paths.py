@@ -0,0 +1,147 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+TABLE_ALIAS = re.compile(r'(?:FROM|JOIN) "(\w+)" (?!ON\b)(\w+)')
+
+
+def hot_paths(user):
+    recipe = Recipe.objects.order_by('-pub_date').first()
+    tag = Tag.objects.order_by('id').first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    paths = [
+        ('recipes', '/api/recipes/', {}),
+        ('recipes by cursor', '/api/recipes/', {'cursor': ''}),
+        ('favorited recipes', '/api/recipes/', {'is_favorited': 1}),
+        ('recipes in cart', '/api/recipes/', {'is_in_shopping_cart': 1}),
+        ('recipes by author', '/api/recipes/', {'author': user.pk}),
+        ('subscriptions', '/api/users/subscriptions/', {'recipes_limit': 3}),
+        ('feed', '/api/recipes/feed/', {}),
+        ('shopping cart', '/api/recipes/download_shopping_cart/', {}),
+    ]
+    if tag is not None:
+        paths.append(('recipes by tag', '/api/recipes/', {'tags': tag.slug}))
+    if recipe is not None:
+        paths.append(('recipe', f'/api/recipes/{recipe.pk}/', {}))
+    if ingredient is not None:
+        paths.append(('ingredient search', '/api/ingredients/',
+                      {'name': ingredient.name[:3]}))
+    return paths
+
+
+def sequential_scans(sql, params):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node.get('Plans', ()))
+                if node['Node Type'] == 'Seq Scan':
+                    yield node['Relation Name'], plan
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = cursor.fetchall()
+            aliases = {
+                alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+            for row in plan:
+                match = SQLITE_SCAN.match(row[-1])
+                if match and 'INDEX' not in match.group(3):
+                    table = match.group(1)
+                    yield aliases.get(table, table), plan
+
+
+class Command(BaseCommand):
+    help = ('Run the hot API paths, EXPLAIN every SELECT a warm request '
+            'issues and fail on sequential scans of large tables.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--min-rows', type=int, default=1000)
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(
+                f'EXPLAIN parsing is not implemented for {connection.vendor}')
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        self.table_sizes = {}
+
+        failures = []
+        for label, path, params in hot_paths(user):
+            statements = []
+
+            def capture(execute, sql, params, many, context):
+                if sql.lstrip().upper().startswith('SELECT'):
+                    statements.append((sql, params))
+                return execute(sql, params, many, context)
+
+            self.get(client, path, params)
+            with connection.execute_wrapper(capture):
+                response = self.get(client, path, params)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{label}: GET {path} returned {response.status_code}')
+
+            scans = []
+            for sql, sql_params in statements:
+                for table, plan in sequential_scans(sql, sql_params):
+                    if self.table_size(table) >= options['min_rows']:
+                        scans.append(table)
+                        if options['verbose_plans']:
+                            self.stdout.write(f'{sql}\n{plan}\n')
+            status = 'seq scan on ' + ', '.join(sorted(set(scans))) \
+                if scans else 'index scans only'
+            self.stdout.write(f'{label}: {len(statements)} queries, {status}')
+            if scans:
+                failures.append(label)
+
+        if failures:
+            raise CommandError(
+                f'Sequential scans on large tables: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot paths use indexes'))
+
+    def get(self, client, path, params):
+        response = client.get(path, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def get_user(self, user_id):
+        users = User.objects.all()
+        if user_id is not None:
+            return users.get(pk=user_id)
+        user = users.annotate(
+            subscriptions=Count('subscribers')).order_by(
+                '-subscriptions', 'id').first()
+        if user is None:
+            raise CommandError('Seed the database first')
+        return user
+
+    def table_size(self, table):
+        if not self.table_sizes:
+            self.table_sizes = dict.fromkeys(
+                connection.introspection.table_names())
+        if table not in self.table_sizes:
+            return 0
+        if self.table_sizes[table] is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM '
+                    f'{connection.ops.quote_name(table)}')
+                self.table_sizes[table] = cursor.fetchone()[0]
+        return self.table_sizes[table]
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+
+
+def scan(path):
+    files = []
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((entry.path, entry.stat().st_mtime))
+    return files
+
+
+class Command(BaseCommand):
+    help = 'Delete media files that no recipe references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--grace-period', type=int,
+                            default=settings.MEDIA_GC_GRACE_PERIOD)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        root = os.fspath(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            self.stdout.write('Media root does not exist')
+            return
+        cutoff = time.time() - options['grace_period']
+
+        roots, files = [], []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    with os.scandir(entry.path) as shards:
+                        for shard in shards:
+                            if shard.is_dir(follow_symlinks=False):
+                                roots.append(shard.path)
+                            elif shard.is_file(follow_symlinks=False):
+                                files.append(
+                                    (shard.path, shard.stat().st_mtime))
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for found in executor.map(scan, roots):
+                files.extend(found)
+
+        referenced = set()
+        recipes = Recipe.objects.only('image', 'image_variants')
+        for recipe in recipes.iterator(chunk_size=2000):
+            referenced.update(images.stored_names(recipe))
+
+        orphans = []
+        for path, mtime in files:
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if mtime < cutoff and name not in referenced:
+                orphans.append(name)
+
+        freed = 0
+        for name in orphans:
+            freed += default_storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(orphans)} of {len(files)} files, '
+            f'{freed} bytes'))
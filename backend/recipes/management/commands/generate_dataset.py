@@ -0,0 +1,227 @@
+import io
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+import numpy as np
+from PIL import Image
+
+from recipes import timeline, versions
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+PREFIX = 'synthetic'
+
+
+def zipf_weights(size, exponent, rng):
+    weights = 1 / np.arange(1, size + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def draw(rng, population, weights, count):
+    if not count:
+        return []
+    count = min(count, len(population))
+    picked = rng.choice(len(population), size=count * 2, p=weights)
+    picked = list(dict.fromkeys(picked.tolist()))[:count]
+    return [population[position] for position in picked]
+
+
+def insert(model, rows, batch_size):
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic dataset with Zipfian popularity for '
+            'load tests and benchmarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Mean favorites per user.')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Mean shopping cart recipes per user.')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Mean subscriptions per user.')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Zipf exponent for popularity.')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete a previously generated dataset.')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Do not rebuild counters, feeds, '
+                                 'shopping lists and search data.')
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'No ingredients, run load_ingredients first')
+        rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        if options['clear']:
+            User.objects.filter(username__startswith=f'{PREFIX}_').delete()
+        elif User.objects.filter(username__startswith=f'{PREFIX}_').exists():
+            raise CommandError(
+                'A synthetic dataset already exists, pass --clear')
+
+        with transaction.atomic():
+            tag_ids = self.create_tags(options['tags'])
+            user_ids = self.create_users(options['users'])
+            author_weights = zipf_weights(
+                len(user_ids), options['exponent'], rng)
+            recipe_ids = self.create_recipes(
+                rng, user_ids, author_weights, tag_ids, ingredient_ids,
+                options)
+            self.create_relations(
+                rng, user_ids, author_weights, recipe_ids, options)
+            versions.bump(versions.TAGS, versions.RECIPES, versions.USERS)
+
+        if not options['skip_derived']:
+            self.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Synthetic dataset generated in '
+            f'{time.perf_counter() - started:.1f}s'))
+
+    def create_tags(self, count):
+        existing = Tag.objects.count()
+        insert(Tag, (
+            Tag(name=f'{PREFIX} {number}', color=f'#{number:06X}',
+                slug=f'{PREFIX}-{number}')
+            for number in range(existing, count)), self.batch_size)
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(PREFIX)
+        insert(User, (
+            User(username=f'{PREFIX}_{number}',
+                 email=f'{PREFIX}_{number}@example.com',
+                 first_name='Synthetic', last_name=str(number),
+                 password=password)
+            for number in range(count)), self.batch_size)
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{PREFIX}_').order_by('id').values_list(
+                'id', flat=True))
+        self.stdout.write(f'Users: {len(user_ids)}')
+        return user_ids
+
+    def placeholder_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (480, 360), (230, 200, 160)).save(buffer, 'PNG')
+        return default_storage.save(
+            f'recipes/{PREFIX}.png', ContentFile(buffer.getvalue()))
+
+    def create_recipes(self, rng, user_ids, author_weights, tag_ids,
+                       ingredient_ids, options):
+        count = options['recipes']
+        authors = rng.choice(user_ids, size=count, p=author_weights)
+        ingredient_weights = zipf_weights(
+            len(ingredient_ids), options['exponent'], rng)
+        names = dict(Ingredient.objects.values_list('id', 'name'))
+        image = self.placeholder_image()
+        now = timezone.now()
+        ages = rng.uniform(0, options['days'] * 86400, size=count)
+
+        recipes = []
+        for number in range(count):
+            ingredients = draw(
+                rng, ingredient_ids, ingredient_weights,
+                int(rng.integers(2, options['ingredients_per_recipe'] * 2)))
+            recipes.append(ingredients)
+        insert(Recipe, (
+            Recipe(author_id=int(authors[number]),
+                   name=f'{names[ingredients[0]].capitalize()} '
+                        f'№{number}',
+                   text=', '.join(names[pk] for pk in ingredients),
+                   image=image,
+                   cooking_time=int(rng.integers(5, 180)))
+            for number, ingredients in enumerate(recipes)), self.batch_size)
+        recipe_ids = list(Recipe.objects.filter(
+            author__username__startswith=f'{PREFIX}_').order_by(
+                'id').values_list('id', flat=True))
+        Recipe.objects.bulk_update([
+            Recipe(pk=recipe_id,
+                   pub_date=now - timedelta(seconds=float(age)))
+            for recipe_id, age in zip(recipe_ids, ages.tolist())
+        ], ['pub_date'], batch_size=1000)
+
+        insert(RecipeIngredient, (
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=pk,
+                             amount=int(rng.integers(1, 500)))
+            for recipe_id, ingredients in zip(recipe_ids, recipes)
+            for pk in ingredients), self.batch_size)
+        tag_weights = zipf_weights(len(tag_ids), options['exponent'], rng)
+        insert(RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=pk)
+            for recipe_id in recipe_ids
+            for pk in draw(rng, tag_ids, tag_weights,
+                           int(rng.integers(1, 4)))), self.batch_size)
+        self.stdout.write(f'Recipes: {len(recipe_ids)}')
+        return recipe_ids
+
+    def create_relations(self, rng, user_ids, author_weights, recipe_ids,
+                         options):
+        recipe_weights = zipf_weights(
+            len(recipe_ids), options['exponent'], rng)
+        for label, model, mean in (
+                ('Favorites', Favorite, options['favorites']),
+                ('Shopping carts', ShoppingCart, options['carts'])):
+            created = insert(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in draw(rng, recipe_ids, recipe_weights,
+                                      int(rng.poisson(mean)))),
+                self.batch_size)
+            self.stdout.write(f'{label}: {created}')
+
+        created = insert(Subscription, (
+            Subscription(subscriber_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in draw(rng, user_ids, author_weights,
+                                  int(rng.poisson(options['subscriptions'])))
+            if author_id != user_id), self.batch_size)
+        self.stdout.write(f'Subscriptions: {created}')
+
+    def rebuild_derived(self):
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        subscriptions = Subscription.objects.filter(
+            subscriber__username__startswith=f'{PREFIX}_').only(
+                'subscriber_id', 'author_id')
+        for subscription in subscriptions.iterator():
+            timeline.backfill(subscription)
+        self.stdout.write('Feeds backfilled')
@@ -1,22 +1,122 @@
 import csv
+import io
+import json
+import time
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes import versions
+from recipes.ingredient_index import ingredient_index
 from recipes.models import Ingredient
 
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file, delimiter=','):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        buffer = buffer[position:].lstrip(' \t\r\n[,')
+        position = 0
+        if buffer.startswith(']'):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                if buffer.strip():
+                    raise CommandError('Malformed JSON ingredients file')
+                return
+            chunk = file.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
-    help = 'Load csv data into Ingredient model from ingredients.csv file.'
+    help = 'Load csv or json data into Ingredient model in bulk.'
 
     def add_arguments(self, parser):
         parser.add_argument('file_path', type=str)
+        parser.add_argument('--format', choices=READERS, dest='file_format')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--copy', action='store_true',
+                            help='Use PostgreSQL COPY instead of INSERT.')
+        parser.add_argument('--dry-run', action='store_true')
 
     def handle(self, *args, **options):
-        file_path = options['file_path']
-        with open(file_path, 'r', encoding='UTF-8') as csv_file:
-            data = csv.reader(csv_file, delimiter=',')
-            for row in data:
-                Ingredient.objects.get_or_create(
-                    name=row[0], measurement_unit=row[1])
-
-        self.stdout.write(self.style.SUCCESS('Data uploaded successfully'))
+        file_path = Path(options['file_path'])
+        file_format = options['file_format'] or file_path.suffix.lstrip('.')
+        if file_format not in READERS:
+            raise CommandError(f'Unsupported file format: {file_format}')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL')
+
+        write = self.copy_batch if options['copy'] else self.insert_batch
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        read = inserted = 0
+
+        with transaction.atomic(), open(
+                file_path, 'r', encoding='UTF-8') as file:
+            seen = set(Ingredient.objects.values_list(
+                'name', 'measurement_unit'))
+            batch = []
+            for row in READERS[file_format](file):
+                read += 1
+                if row in seen:
+                    continue
+                seen.add(row)
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    inserted += self.flush(write, batch, options['dry_run'])
+                    batch = []
+            inserted += self.flush(write, batch, options['dry_run'])
+
+        if inserted and not options['dry_run']:
+            versions.bump(versions.INGREDIENTS)
+            ingredient_index.invalidate()
+
+        elapsed = time.monotonic() - started
+        prefix = ('Dry run, nothing written' if options['dry_run']
+                  else 'Data uploaded successfully')
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}: {read} rows read, '
+            f'{inserted} inserted, {read - inserted} skipped in '
+            f'{elapsed:.2f}s ({read / max(elapsed, 1e-6):.0f} rows/sec)'))
+
+    def flush(self, write, batch, dry_run):
+        if batch and not dry_run:
+            write(batch)
+        return len(batch)
+
+    def insert_batch(self, batch):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in batch],
+            ignore_conflicts=True)
+
+    def copy_batch(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {Ingredient._meta.db_table} '
+                f'(name, measurement_unit) FROM STDIN WITH (FORMAT csv)',
+                buffer)
@@ -0,0 +1,127 @@
+import glob
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SUMMED = ('requests', 'over_budget', 'total_queries', 'total_time',
+          'sql_time', 'serializer_time')
+
+
+def merge(reports):
+    routes = {}
+    for report in reports:
+        for route, stats in report['routes'].items():
+            merged = routes.get(route)
+            if merged is None:
+                routes[route] = stats
+                continue
+            for name in SUMMED:
+                merged[name] += stats[name]
+            merged['max_queries'] = max(
+                merged['max_queries'], stats['max_queries'])
+            for name in ('latency', 'queries'):
+                merged[name] = [
+                    left + right
+                    for left, right in zip(merged[name], stats[name])]
+            for key, duplicate in stats['duplicates'].items():
+                known = merged['duplicates'].setdefault(key, duplicate)
+                if known is not duplicate:
+                    known['requests'] += duplicate['requests']
+                    known['max'] = max(known['max'], duplicate['max'])
+    return routes
+
+
+def bucket_percentile(counts, bounds, fraction):
+    target = fraction * sum(counts)
+    seen = 0
+    for position, count in enumerate(counts):
+        seen += count
+        if count and seen >= target:
+            return bounds[position] if position < len(bounds) else None
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Merge the per-process query profiling reports and print '
+            'per-route latency, query and duplicate statistics.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=settings.QUERY_PROFILING['REPORT_DIR'])
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument('--duplicates', action='store_true')
+        parser.add_argument('--reset', action='store_true',
+                            help='Remove the reports after printing.')
+
+    def handle(self, *args, **options):
+        paths = glob.glob(os.path.join(options['dir'], 'queries-*.json'))
+        if not paths:
+            raise CommandError(f'No reports in {options["dir"]}')
+        reports = []
+        for path in paths:
+            with open(path) as report:
+                reports.append(json.load(report))
+        latency_bounds = reports[0]['latency_buckets']
+        query_bounds = reports[0]['query_buckets']
+        routes = merge(reports)
+
+        rows = []
+        for route, stats in routes.items():
+            rows.append({
+                'route': route,
+                'requests': stats['requests'],
+                'over_budget': stats['over_budget'],
+                'total_time': stats['total_time'],
+                'mean_queries': stats['total_queries'] / stats['requests'],
+                'max_queries': stats['max_queries'],
+                'p95_queries': bucket_percentile(
+                    stats['queries'], query_bounds, 0.95),
+                'p50_ms': bucket_percentile(
+                    stats['latency'], latency_bounds, 0.5),
+                'p95_ms': bucket_percentile(
+                    stats['latency'], latency_bounds, 0.95),
+                'p99_ms': bucket_percentile(
+                    stats['latency'], latency_bounds, 0.99),
+                'sql_share': stats['sql_time'] / stats['total_time']
+                if stats['total_time'] else 0,
+                'serializer_share': stats['serializer_time']
+                / stats['total_time'] if stats['total_time'] else 0,
+                'duplicates': sorted(
+                    stats['duplicates'].values(),
+                    key=lambda duplicate: -duplicate['requests']),
+            })
+        rows.sort(key=lambda row: -row['total_time'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                self.write_row(row, options['duplicates'])
+        if options['reset']:
+            for path in paths:
+                os.remove(path)
+
+    def write_row(self, row, duplicates):
+        def bound(value):
+            return f'<={value}' if value is not None else 'over'
+
+        line = (
+            f'{row["route"]}: {row["requests"]} requests, '
+            f'queries mean {row["mean_queries"]:.1f} '
+            f'p95 {bound(row["p95_queries"])} max {row["max_queries"]}, '
+            f'ms p50 {bound(row["p50_ms"])} p95 {bound(row["p95_ms"])} '
+            f'p99 {bound(row["p99_ms"])}, '
+            f'sql {row["sql_share"]:.0%} '
+            f'serializer {row["serializer_share"]:.0%}')
+        if row['over_budget']:
+            self.stdout.write(self.style.ERROR(
+                f'{line}, {row["over_budget"]} over budget'))
+        else:
+            self.stdout.write(line)
+        if duplicates:
+            for duplicate in row['duplicates']:
+                self.stdout.write(
+                    f'    {duplicate["requests"]} requests, up to '
+                    f'{duplicate["max"]}x: {duplicate["sql"][:200]}')
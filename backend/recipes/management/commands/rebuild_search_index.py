@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from recipes import search
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Rebuild recipe full-text search vectors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.uses_postgres():
+            search.recipe_index.invalidate()
+            search.recipe_index.warm(search.index_version())
+            self.stdout.write(self.style.SUCCESS(
+                f'In-memory search index rebuilt: '
+                f'{len(search.recipe_index)} recipes'))
+            return
+
+        count = 0
+        last_id = 0
+        recipes = Recipe.objects.order_by('id').values_list('id', flat=True)
+        while True:
+            recipe_ids = list(
+                recipes.filter(id__gt=last_id)[:options['batch_size']])
+            if not recipe_ids:
+                break
+            search.refresh(recipe_ids)
+            count += len(recipe_ids)
+            last_id = recipe_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Search vectors rebuilt: {count} recipes'))
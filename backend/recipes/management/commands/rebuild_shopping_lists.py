@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify materialized shopping lists from carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='user_ids')
+        parser.add_argument('--verify', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+
+        if options['verify']:
+            expected = shopping_list.expected_totals(user_ids)
+            stored = shopping_list.stored_totals(user_ids)
+            mismatches = [
+                (key, expected.get(key, 0), stored.get(key, 0))
+                for key in expected.keys() | stored.keys()
+                if expected.get(key, 0) != stored.get(key, 0)
+            ]
+            for (user_id, ingredient_id), want, got in sorted(mismatches):
+                self.stdout.write(
+                    f'user {user_id}, ingredient {ingredient_id}: '
+                    f'expected {want}, stored {got}')
+            if mismatches:
+                raise CommandError(
+                    f'{len(mismatches)} shopping list rows are out of sync')
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(stored)} shopping list rows are in sync'))
+            return
+
+        count = shopping_list.rebuild(user_ids, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Shopping lists rebuilt: {count} rows'))
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User, UserStats
+
+
+def count_rows(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')), Value(0))
+
+
+def batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[
+            :batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in denormalized favorite, cart and recipe counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        recipes_fixed = self.reconcile_recipes()
+        users_fixed = self.reconcile_users()
+
+        verb = 'Would repair' if self.dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {recipes_fixed} recipes and {users_fixed} users'))
+
+    def reconcile_recipes(self):
+        recipes = Recipe.objects.only(
+            'pk', 'favorites_count', 'carts_count').annotate(
+                actual_favorites=count_rows(Favorite, 'recipe'),
+                actual_carts=count_rows(ShoppingCart, 'recipe'))
+
+        fixed = 0
+        for batch in batches(recipes, self.batch_size):
+            drifted = []
+            for recipe in batch:
+                if (recipe.favorites_count != recipe.actual_favorites
+                        or recipe.carts_count != recipe.actual_carts):
+                    recipe.favorites_count = recipe.actual_favorites
+                    recipe.carts_count = recipe.actual_carts
+                    drifted.append(recipe)
+            fixed += len(drifted)
+            if drifted and not self.dry_run:
+                Recipe.objects.bulk_update(
+                    drifted, ['favorites_count', 'carts_count'])
+        return fixed
+
+    def reconcile_users(self):
+        users = User.objects.only('pk').select_related('stats').annotate(
+            actual_recipes=count_rows(Recipe, 'author'),
+            actual_subscribers=count_rows(Subscription, 'author'))
+
+        fixed = 0
+        for batch in batches(users, self.batch_size):
+            to_create, to_update = [], []
+            for user in batch:
+                try:
+                    stats = user.stats
+                except UserStats.DoesNotExist:
+                    to_create.append(UserStats(
+                        user=user,
+                        recipes_count=user.actual_recipes,
+                        subscribers_count=user.actual_subscribers))
+                    continue
+                if (stats.recipes_count != user.actual_recipes
+                        or stats.subscribers_count
+                        != user.actual_subscribers):
+                    stats.recipes_count = user.actual_recipes
+                    stats.subscribers_count = user.actual_subscribers
+                    to_update.append(stats)
+            fixed += len(to_create) + len(to_update)
+            if self.dry_run:
+                continue
+            with transaction.atomic():
+                UserStats.objects.bulk_create(
+                    to_create, ignore_conflicts=True)
+                UserStats.objects.bulk_update(
+                    to_update, ['recipes_count', 'subscribers_count'])
+        return fixed
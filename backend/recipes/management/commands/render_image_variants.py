@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes import images
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Render missing or stale recipe image variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipe', type=int, action='append',
+                            dest='recipe_ids')
+        parser.add_argument('--force', action='store_true')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_variants').order_by('id')
+        if options['recipe_ids']:
+            recipes = recipes.filter(id__in=options['recipe_ids'])
+        pending = [
+            (recipe.pk, recipe.image.name)
+            for recipe in recipes.iterator()
+            if options['force'] or images.needs_variants(recipe)
+        ]
+
+        def render(args):
+            try:
+                return images.render_variants(*args)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            rendered = sum(
+                1 for variants in executor.map(render, pending) if variants)
+        self.stdout.write(self.style.SUCCESS(
+            f'Image variants rendered for {rendered} of '
+            f'{len(pending)} recipes'))
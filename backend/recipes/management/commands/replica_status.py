@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from api.replicas import replica_lag
+
+
+class Command(BaseCommand):
+    help = ('Show whether each read replica is reachable and how far '
+            'it lags behind the primary.')
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured, set DB_REPLICAS')
+        unhealthy = 0
+        for alias in settings.REPLICA_DATABASES:
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError as error:
+                unhealthy += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{alias}: unavailable, {error}'))
+                continue
+            if lag > settings.REPLICA_MAX_LAG:
+                unhealthy += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{alias}: {lag:.1f}s behind, reads go to the primary'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{alias}: {lag:.1f}s behind'))
+        if unhealthy:
+            raise CommandError(f'{unhealthy} replicas are not serving reads')
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_table_versions(apps, schema_editor):
+    TableVersion = apps.get_model('recipes', 'TableVersion')
+    for table in ('tags', 'ingredients', 'recipes', 'users'):
+        TableVersion.objects.get_or_create(table=table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_ingredient_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=50, unique=True, verbose_name='Таблица')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата и время изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия таблицы',
+                'verbose_name_plural': 'Версии таблиц',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата и время изменения'),
+        ),
+        migrations.RunPython(
+            create_table_versions, migrations.RunPython.noop),
+    ]
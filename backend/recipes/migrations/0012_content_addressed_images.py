@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import recipes.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(upload_to=recipes.utils.recipe_image_path, verbose_name='Изображение рецепта'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def dedupe_through_tables(apps, schema_editor):
+    RecipeTag = apps.get_model('recipes', 'RecipeTag')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+
+    duplicates = RecipeTag.objects.values('recipe_id', 'tag_id').annotate(
+        rows=Count('id'), keep=Min('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        RecipeTag.objects.filter(
+            recipe_id=duplicate['recipe_id'],
+            tag_id=duplicate['tag_id']).exclude(
+                id=duplicate['keep']).delete()
+
+    duplicates = RecipeIngredient.objects.values(
+        'recipe_id', 'ingredient_id').annotate(
+            rows=Count('id'), keep=Min('id'),
+            total=Sum('amount')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        RecipeIngredient.objects.filter(id=duplicate['keep']).update(
+            amount=duplicate['total'])
+        RecipeIngredient.objects.filter(
+            recipe_id=duplicate['recipe_id'],
+            ingredient_id=duplicate['ingredient_id']).exclude(
+                id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_through_tables, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
-from recipes.utils import user_directory_path
-from users.models import User
+from recipes.utils import recipe_image_path
+from users.models import Subscription, User
 
 
 class Tag(models.Model):
@@ -58,11 +63,58 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def latest_per_author(self, author_ids, limit=None):
+        recipes = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return recipes
+        ranked = recipes.order_by().annotate(author_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).values('id', 'author_rank')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.author_rank <= %s',
+            (*params, limit)))
+
+    def with_related(self):
+        return self.select_related('author').defer(
+            'search_vector').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient').order_by('id')
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()),
+                author_is_subscribed=Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Subscription.objects.filter(
+                subscriber=user, author=OuterRef('author'))),
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
         related_name='recipes',
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Автор рецепта'
     )
     name = models.CharField(
@@ -71,9 +123,14 @@ class Recipe(models.Model):
         verbose_name='Название рецепта'
     )
     image = models.ImageField(
-        upload_to=user_directory_path,
+        upload_to=recipe_image_path,
         verbose_name='Изображение рецепта'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Уменьшенные копии изображения'
+    )
     text = models.TextField(
         verbose_name='Описание рецепта'
     )
@@ -94,29 +151,83 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата и время публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата и время изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное'
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('favorites_count', 'carts_count')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, **kwargs)
+
 
 class RecipeTag(models.Model):
     recipe = models.ForeignKey(
         Recipe,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     tag = models.ForeignKey(
         Tag,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
     class Meta:
-        ordering = ('recipe__name',)
         verbose_name_plural = 'Тэги рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'tag'],
+                name='unique_recipe_tag'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='recipe_tag_tag_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return (f'"{self.recipe.name}" with tag '
@@ -126,11 +237,13 @@ class RecipeTag(models.Model):
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     ingredient = models.ForeignKey(
         Ingredient,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     amount = models.IntegerField(
         validators=[
@@ -140,9 +253,20 @@ class RecipeIngredient(models.Model):
     )
 
     class Meta:
-        ordering = ('recipe__name',)
         verbose_name = 'Ингредиент рецепта'
         verbose_name_plural = 'Ингредиенты рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='recipe_ingredient_lookup_idx'
+            )
+        ]
 
     def __str__(self):
         return (f'"{self.recipe.name}" with ingredient '
@@ -153,15 +277,16 @@ class RecipeIngredient(models.Model):
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
     class Meta:
-        ordering = ('recipe__name',)
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранные'
         default_related_name = '%(class)ss'
@@ -171,6 +296,12 @@ class Favorite(models.Model):
                 name='uniquee_user_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx'
+            )
+        ]
 
     def __str__(self):
         return (f'"{self.user.username}" in favorties '
@@ -181,7 +312,8 @@ class ShoppingCart(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='shoppingcarts'
+        related_name='shoppingcarts',
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
@@ -190,7 +322,6 @@ class ShoppingCart(models.Model):
     )
 
     class Meta:
-        ordering = ('recipe__name',)
         verbose_name = 'Список покупок'
         default_related_name = '%(class)ss'
         constraints = [
@@ -203,3 +334,148 @@ class ShoppingCart(models.Model):
     def __str__(self):
         return (f'"{self.user.username}" in shoppingcart '
                 f'"{self.recipe.name}"')
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        db_index=False
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items'
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Общее количество ингредиента'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-amount'],
+                name='shopping_list_user_amount_idx'
+            )
+        ]
+
+    def __str__(self):
+        return (f'"{self.user.username}" needs '
+                f'"{self.ingredient.name}" - {self.amount}')
+
+
+class TableVersion(models.Model):
+    table = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Таблица'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата и время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self):
+        return f'{self.table} v{self.version}'
+
+
+class RecipeNeighbor(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        db_index=False
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'neighbor'],
+                name='unique_recipe_neighbor'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipe_neighbor_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} -> {self.neighbor_id}: {self.score:.3f}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        db_index=False,
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата и время публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} <- {self.recipe_id}'
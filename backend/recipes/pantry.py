@@ -0,0 +1,127 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+import numpy as np
+
+from recipes.models import Recipe, RecipeIngredient
+
+
+class PantryIndex:
+    def __init__(self, overlap=None):
+        self.overlap = overlap or timedelta()
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced_at = None
+        self._recipe_ids = None
+
+    def invalidate(self):
+        with self._lock:
+            self._recipe_ids = None
+
+    def _rows(self, recipes, pairs):
+        recipes = list(recipes)
+        recipe_ids = np.array([pk for pk, _ in recipes], dtype=np.int64)
+        pub_dates = np.array(
+            [pub_date.timestamp() for _, pub_date in recipes],
+            dtype=np.float64)
+        pairs = np.array(
+            list(pairs.order_by('recipe_id', 'ingredient_id').values_list(
+                'recipe_id', 'ingredient_id').iterator()),
+            dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[np.isin(pairs[:, 0], recipe_ids)]
+        counts = np.bincount(
+            np.searchsorted(recipe_ids, pairs[:, 0]),
+            minlength=len(recipe_ids))
+        return recipe_ids, pub_dates, counts, pairs[:, 1]
+
+    def _build(self):
+        recipes = Recipe.objects.order_by('id').values_list('id', 'pub_date')
+        (self._recipe_ids, self._pub_dates,
+         self._counts, self._ingredients) = self._rows(
+            recipes.iterator(), RecipeIngredient.objects.all())
+
+    def _update(self, since):
+        changed = list(Recipe.objects.filter(updated_at__gte=since).order_by(
+            'id').values_list('id', 'pub_date'))
+        live_ids = np.fromiter(
+            Recipe.objects.values_list('id', flat=True).iterator(),
+            dtype=np.int64)
+        recipe_ids, pub_dates, counts, ingredients = self._rows(
+            changed, RecipeIngredient.objects.filter(
+                recipe_id__in=[pk for pk, _ in changed]))
+
+        keep = np.isin(self._recipe_ids, live_ids) & ~np.isin(
+            self._recipe_ids, recipe_ids)
+        self._ingredients = np.concatenate(
+            (self._ingredients[np.repeat(keep, self._counts)], ingredients))
+        self._recipe_ids = np.concatenate(
+            (self._recipe_ids[keep], recipe_ids))
+        self._pub_dates = np.concatenate((self._pub_dates[keep], pub_dates))
+        self._counts = np.concatenate((self._counts[keep], counts))
+
+    def _refresh(self, version):
+        with self._lock:
+            if self._recipe_ids is not None and version == self._version:
+                return
+            synced_at = timezone.now()
+            if self._recipe_ids is None or version is None:
+                self._build()
+            else:
+                self._update(self._synced_at - self.overlap)
+            self._indptr = np.concatenate(([0], np.cumsum(self._counts)))
+            self._rows_of = np.repeat(
+                np.arange(len(self._counts)), self._counts)
+            self._version = version
+            self._synced_at = synced_at
+
+    def match(self, pantry, limit=None, min_coverage=0.0, version=None):
+        self._refresh(version)
+        with self._lock:
+            recipe_ids = self._recipe_ids
+            pub_dates = self._pub_dates
+            counts = self._counts
+            indptr = self._indptr
+            ingredients = self._ingredients
+            rows_of = self._rows_of
+
+        if not len(ingredients):
+            return []
+        size = int(ingredients.max()) + 1
+        pantry = np.unique(np.asarray(list(pantry), dtype=np.int64))
+        pantry = pantry[(pantry > 0) & (pantry < size)]
+        available = np.zeros(size, dtype=bool)
+        available[pantry] = True
+        hits = available[ingredients]
+        matched = np.bincount(rows_of[hits], minlength=len(counts))
+        coverage = np.divide(
+            matched, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+        candidates = np.flatnonzero(
+            (matched > 0) & (coverage >= min_coverage))
+        if limit is not None and len(candidates) > limit:
+            cutoff = np.partition(-coverage[candidates], limit - 1)[limit - 1]
+            candidates = candidates[-coverage[candidates] <= cutoff]
+        order = np.lexsort((
+            recipe_ids[candidates],
+            -pub_dates[candidates],
+            -matched[candidates],
+            -coverage[candidates],
+        ))
+        results = []
+        for row in candidates[order][:limit]:
+            start, end = indptr[row], indptr[row + 1]
+            results.append({
+                'recipe_id': int(recipe_ids[row]),
+                'coverage': float(coverage[row]),
+                'matched': int(matched[row]),
+                'total': int(counts[row]),
+                'missing': ingredients[start:end][~hits[start:end]].tolist(),
+            })
+        return results
+
+
+pantry_index = PantryIndex(
+    overlap=timedelta(seconds=settings.PANTRY_INDEX_OVERLAP))
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+import numpy as np
+
+from recipes import similarity
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    RecipeNeighbor,
+    RecipeTag,
+)
+
+
+def load_matrices():
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64)
+
+    def pairs(model, column):
+        return list(model.objects.order_by().values_list(
+            'recipe_id', column).iterator(chunk_size=10000))
+
+    blocks = {
+        'favorites': similarity.incidence(
+            pairs(Favorite, 'user_id'), recipe_ids),
+        'ingredients': similarity.incidence(
+            pairs(RecipeIngredient, 'ingredient_id'), recipe_ids),
+    }
+    tags = similarity.incidence(pairs(RecipeTag, 'tag_id'), recipe_ids)
+    return recipe_ids, blocks, similarity.normalize_rows(tags).tocsr()
+
+
+def store_neighbors(recipe_ids, chunk_ids, rows, columns, scores):
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(recipe_id__in=chunk_ids).delete()
+        RecipeNeighbor.objects.bulk_create(
+            (RecipeNeighbor(recipe_id=recipe_id, neighbor_id=neighbor_id,
+                            score=score)
+             for recipe_id, neighbor_id, score in zip(
+                 recipe_ids[rows].tolist(), recipe_ids[columns].tolist(),
+                 scores.tolist())),
+            batch_size=2000)
+    return len(rows)
+
+
+def compute_neighbors(top_k, workers=None, chunk_size=1000, max_df=None,
+                      progress=None):
+    weights = settings.RECOMMENDATION_WEIGHTS
+    recipe_ids, blocks, tags = load_matrices()
+    if not len(recipe_ids):
+        return 0
+    features = similarity.features(
+        blocks, weights, max_df, settings.RECOMMENDATION_MAX_DF_FLOOR)
+    bounds = [
+        (start, min(start + chunk_size, len(recipe_ids)))
+        for start in range(0, len(recipe_ids), chunk_size)
+    ]
+
+    stored = 0
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=similarity.init_worker,
+            initargs=(features, tags, weights['tags'], top_k)) as executor:
+        for (start, stop), (rows, columns, scores) in zip(
+                bounds, executor.map(similarity.neighbors, bounds)):
+            stored += store_neighbors(
+                recipe_ids, recipe_ids[start:stop].tolist(),
+                rows, columns, scores)
+            if progress is not None:
+                progress(stop, len(recipe_ids))
+    return stored
+
+
+def recommend(user, favorite_ids, subscription_ids, limit):
+    scores = defaultdict(float)
+    candidates = limit * 2
+
+    if favorite_ids:
+        neighbors = RecipeNeighbor.objects.filter(
+            recipe_id__in=favorite_ids).exclude(
+                neighbor_id__in=favorite_ids).values('neighbor_id').annotate(
+                    total=Sum('score')).order_by('-total')[:candidates]
+        neighbors = list(neighbors)
+        if neighbors:
+            best = neighbors[0]['total']
+            for neighbor in neighbors:
+                scores[neighbor['neighbor_id']] += neighbor['total'] / best
+
+    if subscription_ids:
+        recent = Recipe.objects.filter(
+            author_id__in=subscription_ids).exclude(
+                pk__in=favorite_ids).order_by('-pub_date').values_list(
+                    'id', flat=True)[:candidates]
+        for position, pk in enumerate(recent):
+            scores[pk] += (settings.RECOMMENDATION_SUBSCRIPTION_WEIGHT
+                           * 0.9 ** position)
+
+    if len(scores) < candidates:
+        popular = Recipe.objects.exclude(pk__in=favorite_ids).exclude(
+            author=user).order_by('-favorites_count', '-pub_date').values_list(
+                'id', flat=True)[:candidates]
+        for position, pk in enumerate(popular):
+            scores.setdefault(pk, -position - 1)
+
+    return sorted(scores, key=lambda pk: (-scores[pk], pk))
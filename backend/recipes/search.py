@@ -0,0 +1,173 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector
+)
+from django.db import connection, transaction
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, StrIndex
+
+from recipes import versions
+from recipes.models import Recipe, RecipeIngredient
+
+TOKEN_RE = re.compile(r'\w+')
+
+SQLITE_MAX_RESULTS = 500
+
+WEIGHTS = {
+    'name': 1.0,
+    'ingredients': 0.4,
+    'text': 0.2,
+}
+
+_pending = threading.local()
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(value):
+    return TOKEN_RE.findall(value.casefold())
+
+
+def search_vector():
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredient_names = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')).values('names')
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(Coalesce(Subquery(ingredient_names), Value('')),
+                       weight='B', config=config)
+        + SearchVector('text', weight='C', config=config)
+    )
+
+
+def refresh(recipe_ids):
+    if uses_postgres():
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=search_vector())
+
+
+def _refresh_pending():
+    recipe_ids = getattr(_pending, 'recipe_ids', None)
+    if recipe_ids:
+        _pending.recipe_ids = set()
+        refresh(recipe_ids)
+        versions.bump_on_commit(versions.RECIPES)
+
+
+def refresh_on_commit(recipe_ids):
+    if not uses_postgres():
+        return
+    if getattr(_pending, 'recipe_ids', None) is None:
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(_refresh_pending)
+
+
+class RecipeSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._positions = None
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._postings = None
+            self._positions = None
+
+    def _load(self, version=None):
+        with self._lock:
+            if self._postings is None or version != self._version:
+                postings = defaultdict(lambda: defaultdict(float))
+                positions = {}
+                recipes = Recipe.objects.order_by('-pub_date', 'id')
+                for pk, name, text in recipes.values_list(
+                        'id', 'name', 'text').iterator(chunk_size=2000):
+                    positions[pk] = len(positions)
+                    for field, value in (('name', name), ('text', text)):
+                        for token in tokenize(value):
+                            postings[token][pk] += WEIGHTS[field]
+                names = RecipeIngredient.objects.order_by().values_list(
+                    'recipe_id', 'ingredient__name')
+                for pk, name in names.iterator(chunk_size=2000):
+                    for token in tokenize(name):
+                        postings[token][pk] += WEIGHTS['ingredients']
+                self._postings = {
+                    token: dict(documents)
+                    for token, documents in postings.items()
+                }
+                self._positions = positions
+                self._version = version
+            return self._postings, self._positions
+
+    def warm(self, version=None):
+        self._load(version)
+
+    def __len__(self):
+        return len(self._positions or ())
+
+    def search(self, query, limit=None, version=None):
+        postings, positions = self._load(version)
+        terms = set(tokenize(query))
+        if not terms or any(term not in postings for term in terms):
+            return []
+
+        terms = sorted(terms, key=lambda term: len(postings[term]))
+        scores = {pk: 0.0 for pk in postings[terms[0]]}
+        for term in terms[1:]:
+            documents = postings[term]
+            scores = {pk: score for pk, score in scores.items()
+                      if pk in documents}
+        for term in terms:
+            documents = postings[term]
+            idf = math.log(1 + len(positions) / len(documents))
+            for pk in scores:
+                scores[pk] += (1 + math.log(documents[pk])) * idf
+        ranked = sorted(
+            scores, key=lambda pk: (-scores[pk], positions.get(pk, 0)))
+        return ranked[:limit]
+
+
+recipe_index = RecipeSearchIndex()
+
+
+def index_version():
+    tables = versions.get_versions(versions.RECIPES, versions.INGREDIENTS)
+    return tuple(tables[table].version for table in sorted(tables))
+
+
+def max_results():
+    if connection.vendor == 'sqlite':
+        return min(settings.RECIPE_SEARCH_MAX_RESULTS, SQLITE_MAX_RESULTS)
+    return settings.RECIPE_SEARCH_MAX_RESULTS
+
+
+def search_recipes(queryset, query):
+    if uses_postgres():
+        search_query = SearchQuery(
+            query, config=settings.RECIPE_SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-pub_date', 'id')
+
+    recipe_ids = recipe_index.search(
+        query, max_results(), index_version())
+    if not recipe_ids:
+        return queryset.none()
+    ranking = ',{},'.format(','.join(map(str, recipe_ids)))
+    return queryset.filter(pk__in=recipe_ids).annotate(
+        search_rank=StrIndex(
+            Value(ranking),
+            Concat(Value(','), Cast('pk', CharField()), Value(',')))
+    ).order_by('search_rank')
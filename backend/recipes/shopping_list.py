@@ -0,0 +1,123 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from users.models import User
+
+
+def recipe_amounts(recipe):
+    amounts = RecipeIngredient.objects.filter(recipe=recipe).values(
+        'ingredient').annotate(total=Sum('amount')).order_by()
+    return {row['ingredient']: row['total'] for row in amounts}
+
+
+def apply_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    user_ids = {user_id for user_id, _ in deltas}
+    ingredient_ids = {ingredient_id for _, ingredient_id in deltas}
+
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            id__in=user_ids).order_by('id').values_list('id', flat=True))
+        existing = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.filter(
+                user_id__in=user_ids, ingredient_id__in=ingredient_ids)
+        }
+
+        to_create, to_update, to_delete = [], [], []
+        for (user_id, ingredient_id), delta in deltas.items():
+            item = existing.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    to_create.append(ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=delta))
+                continue
+            item.amount += delta
+            if item.amount > 0:
+                to_update.append(item)
+            else:
+                to_delete.append(item.id)
+
+        ShoppingListItem.objects.bulk_create(to_create)
+        ShoppingListItem.objects.bulk_update(to_update, ['amount'])
+        ShoppingListItem.objects.filter(id__in=to_delete).delete()
+
+
+def add_recipe(user_id, recipe, sign=1):
+    apply_deltas({
+        (user_id, ingredient_id): sign * amount
+        for ingredient_id, amount in recipe_amounts(recipe).items()
+    })
+
+
+def remove_recipe(user_id, recipe):
+    add_recipe(user_id, recipe, sign=-1)
+
+
+def update_recipe(recipe, old_amounts, new_amounts):
+    changes = {}
+    for ingredient_id in old_amounts.keys() | new_amounts.keys():
+        change = (new_amounts.get(ingredient_id, 0)
+                  - old_amounts.get(ingredient_id, 0))
+        if change:
+            changes[ingredient_id] = change
+    if not changes:
+        return
+
+    user_ids = ShoppingCart.objects.filter(
+        recipe=recipe).values_list('user_id', flat=True)
+    apply_deltas({
+        (user_id, ingredient_id): change
+        for user_id in user_ids
+        for ingredient_id, change in changes.items()
+    })
+
+
+def expected_totals(user_ids=None):
+    rows = RecipeIngredient.objects.filter(
+        recipe__shoppingcarts__isnull=False)
+    if user_ids is not None:
+        rows = rows.filter(recipe__shoppingcarts__user__in=user_ids)
+    rows = rows.values(
+        'recipe__shoppingcarts__user', 'ingredient').annotate(
+            total=Sum('amount')).order_by()
+
+    totals = defaultdict(int)
+    for row in rows:
+        key = (row['recipe__shoppingcarts__user'], row['ingredient'])
+        totals[key] += row['total']
+    return totals
+
+
+def stored_totals(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            'user_id', 'ingredient_id', 'amount')
+    }
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    totals = expected_totals(user_ids)
+    with transaction.atomic():
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user__in=user_ids)
+        items.delete()
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount)
+             for (user_id, ingredient_id), amount in totals.items()),
+            batch_size=batch_size)
+    return len(totals)
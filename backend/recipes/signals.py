@@ -0,0 +1,163 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from recipes import images, search, shopping_list, timeline, versions
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from users import stats
+from users.models import Subscription, User
+
+
+def increment_recipe(recipe_id, field, delta):
+    Recipe.objects.filter(pk=recipe_id).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+        increment_recipe(instance.recipe_id, 'carts_count', 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+    increment_recipe(instance.recipe_id, 'carts_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+def count_favorite(sender, instance, created, **kwargs):
+    if created:
+        increment_recipe(instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def uncount_favorite(sender, instance, **kwargs):
+    increment_recipe(instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'recipes_count')
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_on_commit(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def unfollow_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance)
+    timeline.resume_push_on_commit(instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_recipe(sender, instance, **kwargs):
+    stats.increment(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(pre_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    if instance.pk and instance.image and not instance.image._committed:
+        old = Recipe.objects.filter(pk=instance.pk).only(
+            'image', 'image_variants').first()
+        if old is not None and old.image.name == images.upload_name(instance):
+            instance.image = old.image.name
+            instance.image_variants = old.image_variants
+            return
+        instance.image_variants = {}
+        if old is not None:
+            images.release_on_commit(images.stored_names(old))
+
+
+@receiver(post_save, sender=Recipe)
+def render_image_variants(sender, instance, **kwargs):
+    if images.needs_variants(instance):
+        images.schedule_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    images.release_on_commit(images.stored_names(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_vector(sender, instance, **kwargs):
+    search.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_recipe_search_vector(sender, instance, **kwargs):
+    search.refresh_on_commit([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        search.refresh_on_commit(RecipeIngredient.objects.filter(
+            ingredient=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+    versions.bump_on_commit(versions.INGREDIENTS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    versions.bump_on_commit(versions.TAGS)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def bump_recipes_version(sender, **kwargs):
+    versions.bump_on_commit(versions.RECIPES)
+
+
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_recipe(sender, instance, **kwargs):
+    versions.touch_recipes_on_commit(instance.recipe_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    versions.bump_on_commit(versions.USERS)
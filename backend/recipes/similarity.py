@@ -0,0 +1,71 @@
+import numpy as np
+from scipy import sparse
+
+_features = None
+_tags = None
+_tag_weight = None
+_top_k = None
+
+
+def incidence(pairs, row_ids):
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], row_ids)]
+    columns, column_index = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs)),
+         (np.searchsorted(row_ids, pairs[:, 0]), column_index)),
+        shape=(len(row_ids), len(columns)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def tfidf(matrix, max_df=None, df_floor=1):
+    rows = matrix.shape[0]
+    df = np.asarray(matrix.sum(axis=0)).ravel()
+    idf = np.log((1 + rows) / (1 + df)) + 1
+    if max_df is not None:
+        idf[df > max(max_df * rows, df_floor)] = 0
+    matrix = matrix @ sparse.diags(idf)
+    matrix.eliminate_zeros()
+    return normalize_rows(matrix).tocsr()
+
+
+def features(blocks, weights, max_df=None, df_floor=1):
+    return sparse.hstack([
+        np.sqrt(weights[name]) * tfidf(matrix, max_df, df_floor)
+        for name, matrix in blocks.items()
+    ]).tocsr()
+
+
+def init_worker(feature_matrix, tag_matrix, tag_weight, top_k):
+    global _features, _tags, _tag_weight, _top_k
+    _features = feature_matrix
+    _tags = tag_matrix
+    _tag_weight = tag_weight
+    _top_k = top_k
+
+
+def neighbors(bounds):
+    start, stop = bounds
+    similarity = (_features[start:stop] @ _features.T).tocoo()
+    rows, columns = similarity.row, similarity.col
+    scores = similarity.data
+    if _tag_weight:
+        scores = scores + _tag_weight * np.asarray(
+            _tags[rows + start].multiply(_tags[columns]).sum(axis=1)).ravel()
+    keep = (rows + start != columns) & (scores > 0)
+    rows, columns, scores = rows[keep], columns[keep], scores[keep]
+
+    order = np.lexsort((-scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    starts = np.searchsorted(rows, np.arange(stop - start))
+    rank = np.arange(len(rows)) - starts[rows]
+    keep = rank < _top_k
+    return rows[keep] + start, columns[keep], scores[keep]
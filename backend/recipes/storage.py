@@ -0,0 +1,32 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def digest(self, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    def hashed_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        top = directory.split('/')[0]
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(top, digest[:2], digest[2:4], digest + ext)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, self.digest(content))
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        part = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(part), self.path(name))
+        return name
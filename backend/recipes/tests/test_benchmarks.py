@@ -0,0 +1,80 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import TransactionTestCase
+
+from recipes.models import Favorite, Ingredient, Recipe, Tag
+from users.models import Subscription, User
+
+DATASET = ('--users', '12', '--recipes', '30', '--tags', '3',
+           '--favorites', '3', '--carts', '2', '--subscriptions', '2')
+
+
+class DatasetCommandsTest(TransactionTestCase):
+    def setUp(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient {number}', measurement_unit='г')
+            for number in range(20))
+
+    def call(self, name, *args):
+        stdout = StringIO()
+        call_command(name, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_generate_dataset(self):
+        output = self.call('generate_dataset', *DATASET)
+        self.assertIn('Synthetic dataset generated', output)
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertFalse(Subscription.objects.filter(
+            subscriber_id=F('author_id')).exists())
+        favorites = dict(Favorite.objects.values('recipe_id').annotate(
+            total=Count('id')).values_list('recipe_id', 'total'))
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.favorites_count, favorites.get(recipe.pk, 0))
+
+    def test_generate_dataset_requires_clear_to_regenerate(self):
+        self.call('generate_dataset', *DATASET, '--skip-derived')
+        with self.assertRaisesMessage(CommandError, 'pass --clear'):
+            self.call('generate_dataset', *DATASET, '--skip-derived')
+        self.call('generate_dataset', *DATASET, '--skip-derived', '--clear')
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Recipe.objects.count(), 30)
+
+    def test_generate_dataset_requires_ingredients(self):
+        Ingredient.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'load_ingredients'):
+            self.call('generate_dataset', *DATASET)
+
+    def test_benchmark_api(self):
+        self.call('generate_dataset', *DATASET)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'results.json')
+            output = self.call(
+                'benchmark_api', '--requests', '6', '--warmup', '1',
+                '--concurrency', '2', '--users', '3',
+                '--endpoint', 'recipes', '--endpoint', 'recipe',
+                '--endpoint', 'subscriptions', '--output', str(path))
+            report = json.loads(path.read_text())
+            compared = self.call(
+                'benchmark_api', '--requests', '2', '--warmup', '0',
+                '--endpoint', 'recipes', '--compare', str(path))
+        self.assertIn('recipes: ', output)
+        self.assertEqual(report['mode'], 'client')
+        self.assertEqual(report['dataset']['recipes'], 30)
+        for name in ('recipes', 'recipe', 'subscriptions'):
+            result = report['endpoints'][name]
+            self.assertEqual((result['requests'], result['errors']), (6, 0))
+            self.assertGreater(result['mean_queries'], 0)
+        self.assertIn('Compared with', compared)
+
+    def test_benchmark_api_rejects_unknown_endpoints(self):
+        self.call('generate_dataset', *DATASET, '--skip-derived')
+        with self.assertRaisesMessage(CommandError, 'Unknown endpoints'):
+            self.call('benchmark_api', '--endpoint', 'nope')
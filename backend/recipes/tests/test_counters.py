@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+    image_data,
+)
+from api.serializers import RecipeSerializer
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class CounterWriteBackTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.tags = create_tags(1)
+        self.ingredients = create_ingredients(2)
+        self.recipe = create_recipe(self.author, self.tags, self.ingredients)
+
+    def assertCounters(self, favorites, carts):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(
+            (recipe.favorites_count, recipe.carts_count), (favorites, carts))
+
+    def test_save_of_stale_instance_keeps_counters(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertCounters(1, 1)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name, 'Renamed')
+
+    def test_recipe_edit_keeps_concurrent_increments(self):
+        sync_tags = RecipeSerializer.sync_tags
+
+        def favorite_meanwhile(serializer, instance, tag_ids):
+            Favorite.objects.create(user=self.reader, recipe=self.recipe)
+            return sync_tags(serializer, instance, tag_ids)
+
+        data = {
+            'name': 'Renamed',
+            'text': 'Text',
+            'cooking_time': 5,
+            'image': image_data(),
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [{'id': ingredient.pk, 'amount': 3}
+                            for ingredient in self.ingredients],
+        }
+        with mock.patch.object(
+                RecipeSerializer, 'sync_tags', favorite_meanwhile):
+            response = api_client(self.author).patch(
+                f'/api/recipes/{self.recipe.pk}/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(1, 0)
+
+    def test_counters_are_not_editable(self):
+        editable = {field.name for field in Recipe._meta.fields
+                    if field.editable}
+        self.assertFalse(editable & set(Recipe.COUNTER_FIELDS))
@@ -0,0 +1,79 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.ingredient_index import ingredient_index
+from recipes.management.commands.explain_hot_paths import sequential_scans
+from recipes.models import Favorite, Ingredient, ShoppingCart
+from users.models import Subscription
+
+
+class SequentialScansTest(TestCase):
+    def scanned(self, sql, params=()):
+        return {table for table, _ in sequential_scans(sql, params)}
+
+    def test_full_table_read_is_a_scan(self):
+        self.assertEqual(
+            self.scanned('SELECT * FROM "recipes_recipe"'),
+            {'recipes_recipe'})
+
+    def test_primary_key_lookup_is_not_a_scan(self):
+        self.assertEqual(self.scanned(
+            'SELECT * FROM "recipes_recipe" WHERE "id" = %s', [1]), set())
+
+    def test_aliases_resolve_to_tables(self):
+        self.assertEqual(self.scanned(
+            'SELECT * FROM "recipes_recipe" U0 '
+            'INNER JOIN "recipes_tag" U1 ON U1."id" = %s', [1]),
+            {'recipes_recipe'})
+
+
+class ExplainHotPathsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        reader = create_user('reader')
+        tags = create_tags(2)
+        ingredients = create_ingredients(4)
+        for number in range(3):
+            author = create_user(f'author{number}')
+            Subscription.objects.create(subscriber=reader, author=author)
+            recipe = create_recipe(
+                author, tags, ingredients, name=f'Recipe {number}')
+            Favorite.objects.create(user=reader, recipe=recipe)
+            ShoppingCart.objects.create(user=reader, recipe=recipe)
+        cls.reader = reader
+
+    def call(self, *args):
+        stdout = StringIO()
+        call_command('explain_hot_paths', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_small_tables_are_ignored(self):
+        output = self.call('--user', str(self.reader.pk))
+        self.assertIn('recipes: ', output)
+        self.assertIn('All hot paths use indexes', output)
+
+    def test_scans_above_min_rows_fail(self):
+        with mock.patch(
+                'recipes.management.commands.explain_hot_paths.hot_paths',
+                return_value=[('users', '/api/users/', {})]):
+            with self.assertRaisesMessage(
+                    CommandError, 'Sequential scans on large tables: users'):
+                self.call('--user', str(self.reader.pk), '--min-rows', '1')
+
+    def test_index_builds_are_not_explained(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'extra {number}', measurement_unit='г')
+            for number in range(30))
+        ingredient_index.invalidate()
+        output = self.call('--user', str(self.reader.pk), '--min-rows', '20')
+        self.assertIn('ingredient search: 1 queries, index scans only', output)
+        self.assertIn('All hot paths use indexes', output)
@@ -0,0 +1,74 @@
+import base64
+import io
+import textwrap
+from unittest import mock
+
+from django.test import TestCase
+from PIL import Image
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_tags,
+    create_user,
+    image_data,
+)
+from recipes.models import Recipe
+
+
+def other_image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (10, 90, 200)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class RecipeImageUpdateTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.tags = create_tags(1)
+        self.ingredients = create_ingredients(1)
+        self.client = api_client(self.author)
+        response = self.save(self.client.post, '/api/recipes/', image_data())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.recipe = Recipe.objects.get()
+        self.assertTrue(self.recipe.image_variants)
+
+    def save(self, method, path, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return method(path, {
+                'name': 'Recipe',
+                'text': 'Text',
+                'cooking_time': 5,
+                'image': image,
+                'tags': [tag.pk for tag in self.tags],
+                'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            }, format='json')
+
+    def patch(self, image):
+        response = self.save(
+            self.client.patch, f'/api/recipes/{self.recipe.pk}/', image)
+        self.assertEqual(response.status_code, 200, response.data)
+        return Recipe.objects.get(pk=self.recipe.pk)
+
+    def test_unchanged_image_keeps_variants(self):
+        with mock.patch('recipes.images.schedule_variants') as schedule, \
+                mock.patch('recipes.images.release') as release:
+            recipe = self.patch(image_data())
+        self.assertEqual(recipe.image.name, self.recipe.image.name)
+        self.assertEqual(recipe.image_variants, self.recipe.image_variants)
+        schedule.assert_not_called()
+        release.assert_not_called()
+
+    def test_replaced_image_is_rendered_again(self):
+        recipe = self.patch(other_image_data())
+        self.assertNotEqual(recipe.image.name, self.recipe.image.name)
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+
+    def test_line_wrapped_base64_is_accepted(self):
+        header, encoded = other_image_data().split(',')
+        recipe = self.patch(
+            header + ',' + '\r\n'.join(textwrap.wrap(encoded, 76)))
+        self.assertEqual(
+            recipe.image.name,
+            self.patch(other_image_data()).image.name)
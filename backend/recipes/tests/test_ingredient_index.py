@@ -0,0 +1,64 @@
+from django.test import TestCase
+
+from api.tests.fixtures import api_client
+from recipes import versions
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Ingredient
+
+NAMES = [
+    'Соль', 'Соль морская', 'Сахар', 'Сахарная пудра', 'Морская капуста',
+    'Масло сливочное', 'Масло оливковое', 'Сливки', 'Фасоль',
+    'Ванильный сахар',
+]
+
+
+class IngredientIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in NAMES)
+
+    def setUp(self):
+        self.index = IngredientIndex()
+
+    def names(self, query, limit=None):
+        return [entry['name']
+                for entry in self.index.search(query, limit, version=1)]
+
+    def scan(self, query):
+        query = query.casefold()
+        names = sorted(NAMES, key=str.casefold)
+        return ([name for name in names if name.casefold().startswith(query)]
+                + [name for name in names
+                   if query in name.casefold()
+                   and not name.casefold().startswith(query)])
+
+    def test_matches_full_scan(self):
+        for query in ('', 'с', 'со', 'сол', 'соль', 'СОЛЬ', 'сахар',
+                      'ахар', 'морская', 'масло сл', 'лив', 'ль', 'xyz'):
+            with self.subTest(query=query):
+                self.assertEqual(self.names(query), self.scan(query))
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(self.names('сахар'),
+                         ['Сахар', 'Сахарная пудра', 'Ванильный сахар'])
+        self.assertEqual(self.names('соль', limit=2), ['Соль', 'Соль морская'])
+        self.assertEqual(self.names('оль', limit=1), ['Соль'])
+
+    def test_rebuilds_when_version_changes(self):
+        self.assertEqual(self.names('перец'), [])
+        Ingredient.objects.create(name='Перец', measurement_unit='г')
+        self.assertEqual(self.names('перец'), [])
+        self.assertEqual(
+            [entry['name'] for entry in self.index.search('перец', version=2)],
+            ['Перец'])
+
+    def test_endpoint_needs_only_the_version_query(self):
+        versions.bump(versions.INGREDIENTS)
+        client = api_client()
+        client.get('/api/ingredients/', {'name': 'сол'})
+        with self.assertNumQueries(1):
+            response = client.get('/api/ingredients/', {'name': 'мор'})
+        self.assertEqual(
+            [row['name'] for row in response.data],
+            ['Морская капуста', 'Соль морская'])
@@ -0,0 +1,85 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes import versions
+from recipes.management.commands import load_ingredients
+from recipes.models import Ingredient
+
+ROWS = [('абрикосы', 'г'), ('соль', 'г'), ('молоко', 'мл')]
+
+
+class LoadIngredientsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='UTF-8')
+        return str(path)
+
+    def csv_file(self, rows=ROWS):
+        return self.write('ingredients.csv', ''.join(
+            f'{name},{unit}\n' for name, unit in rows))
+
+    def json_file(self, rows=ROWS, name='ingredients.json'):
+        return self.write(name, json.dumps(
+            [{'name': name, 'measurement_unit': unit} for name, unit in rows],
+            ensure_ascii=False, indent=1))
+
+    def load(self, *args):
+        stdout = StringIO()
+        call_command('load_ingredients', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def stored(self):
+        return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+    def test_loads_csv(self):
+        output = self.load(self.csv_file(), '--batch-size', '2')
+        self.assertEqual(self.stored(), set(ROWS))
+        self.assertIn('3 rows read, 3 inserted, 0 skipped', output)
+
+    def test_loads_json_in_chunks(self):
+        rows = [(f'ingredient {number}', 'г') for number in range(200)]
+        path = self.json_file(rows)
+        with mock.patch.object(load_ingredients, 'JSON_CHUNK_SIZE', 16):
+            self.load(path)
+        self.assertEqual(self.stored(), set(rows))
+
+    def test_format_option_overrides_suffix(self):
+        self.load(self.json_file(name='ingredients.txt'), '--format', 'json')
+        self.assertEqual(self.stored(), set(ROWS))
+
+    def test_existing_and_repeated_rows_are_skipped(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        output = self.load(self.csv_file(ROWS + ROWS[:1]))
+        self.assertEqual(self.stored(), set(ROWS))
+        self.assertIn('4 rows read, 2 inserted, 2 skipped', output)
+
+    def test_dry_run_writes_nothing(self):
+        before = versions.get_versions(versions.INGREDIENTS)
+        output = self.load(self.csv_file(), '--dry-run')
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertIn('Dry run, nothing written: 3 rows read', output)
+        self.assertEqual(
+            versions.get_versions(versions.INGREDIENTS)[
+                versions.INGREDIENTS].version,
+            before[versions.INGREDIENTS].version)
+
+    def test_malformed_json_is_rejected(self):
+        path = self.write('broken.json', '[{"name": "соль", ')
+        with self.assertRaisesMessage(CommandError, 'Malformed JSON'):
+            self.load(path)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_unsupported_format_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'Unsupported'):
+            self.load(self.write('ingredients.xml', ''))
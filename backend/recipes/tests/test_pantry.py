@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes import versions
+from recipes.models import RecipeIngredient
+from recipes.pantry import PantryIndex
+
+
+class PantryIndexUpdateTest(TestCase):
+    def setUp(self):
+        self.tags = create_tags(1)
+        self.ingredients = create_ingredients(4)
+        author = create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(
+                author, self.tags, self.ingredients[:2], name='Soup')
+            create_recipe(
+                author, self.tags, self.ingredients[2:3], name='Salad')
+        self.index = PantryIndex()
+        self.match()
+
+    def match(self, *ingredients):
+        version = versions.get_versions(versions.RECIPES)[versions.RECIPES]
+        return {
+            match['recipe_id']: match for match in self.index.match(
+                [ingredient.pk for ingredient in ingredients],
+                version=version.version)}
+
+    def test_added_ingredient_row_is_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.recipe, ingredient=self.ingredients[3], amount=1)
+
+        matches = self.match(self.ingredients[3])
+        self.assertEqual(list(matches), [self.recipe.pk])
+        self.assertEqual(matches[self.recipe.pk]['total'], 3)
+
+    def test_deleted_ingredient_is_dropped_from_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredients[0].delete()
+
+        matches = self.match(self.ingredients[1])
+        self.assertEqual(matches[self.recipe.pk]['total'], 1)
+        self.assertEqual(matches[self.recipe.pk]['missing'], [])
@@ -0,0 +1,77 @@
+import numpy as np
+from django.conf import settings
+from django.test import TestCase
+from scipy import sparse
+
+from api.tests.fixtures import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes import similarity
+from recipes.models import Favorite, RecipeNeighbor
+from recipes.recommendations import compute_neighbors
+
+
+class TfidfTest(TestCase):
+    def matrix(self):
+        return sparse.csr_matrix(np.array([
+            [1, 1, 0],
+            [1, 0, 1],
+            [1, 0, 0],
+            [0, 1, 0],
+        ], dtype=float))
+
+    def test_rows_are_normalized(self):
+        weights = similarity.tfidf(self.matrix()).toarray()
+        np.testing.assert_allclose(np.linalg.norm(weights, axis=1), 1)
+
+    def test_common_features_weigh_less(self):
+        weights = similarity.tfidf(self.matrix()).toarray()
+        self.assertLess(weights[0, 0], weights[0, 1])
+
+    def test_max_df_drops_frequent_features(self):
+        weights = similarity.tfidf(self.matrix(), max_df=0.5).toarray()
+        self.assertFalse(weights[:, 0].any())
+        self.assertTrue(weights[0, 1])
+
+    def test_max_df_keeps_features_under_floor(self):
+        weights = similarity.tfidf(
+            self.matrix(), max_df=0.05, df_floor=50).toarray()
+        self.assertTrue(weights[:3, 0].all())
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        self.viewer = create_user('viewer')
+        author = create_user('author')
+        tags = create_tags(1)
+        ingredients = create_ingredients(3)
+        shared, other = ingredients[:2], ingredients[2:]
+        self.liked = create_recipe(author, tags, shared, name='Liked')
+        self.similar = create_recipe(author, tags, shared, name='Similar')
+        self.popular = create_recipe(author, tags, other, name='Popular')
+        Favorite.objects.create(user=self.viewer, recipe=self.liked)
+        for username in ('first', 'second'):
+            Favorite.objects.create(
+                user=create_user(username), recipe=self.popular)
+
+    def test_compute_neighbors_links_recipes_with_shared_ingredients(self):
+        stored = compute_neighbors(
+            top_k=5, workers=1, max_df=settings.RECOMMENDATION_MAX_DF)
+        self.assertEqual(stored, RecipeNeighbor.objects.count())
+        self.assertTrue(RecipeNeighbor.objects.filter(
+            recipe=self.liked, neighbor=self.similar).exists())
+        self.assertFalse(RecipeNeighbor.objects.filter(
+            recipe=self.liked, neighbor=self.popular).exists())
+
+    def test_recommended_prefers_neighbours_over_popular(self):
+        compute_neighbors(
+            top_k=5, workers=1, max_df=settings.RECOMMENDATION_MAX_DF)
+        response = api_client(self.viewer).get('/api/recipes/recommended/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.json()],
+            ['Similar', 'Popular'])
@@ -0,0 +1,55 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.tests.fixtures import create_user
+from recipes import search
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+
+class RecipeSearchTest(TestCase):
+    def setUp(self):
+        search.recipe_index.invalidate()
+        self.addCleanup(search.recipe_index.invalidate)
+        self.author = create_user('author')
+
+    def create_recipes(self, count, name='Борщ', text='Текст'):
+        Recipe.objects.bulk_create(
+            Recipe(author=self.author, name=f'{name} {number}', text=text,
+                   image='recipe.png', cooking_time=10)
+            for number in range(count))
+
+    def search(self, query):
+        return list(search.search_recipes(
+            Recipe.objects.all(), query).values_list('name', flat=True))
+
+    def test_name_matches_rank_above_text_matches(self):
+        Recipe.objects.create(
+            author=self.author, name='Суп', text='Почти борщ',
+            image='recipe.png', cooking_time=10)
+        self.create_recipes(1)
+        self.assertEqual(self.search('борщ'), ['Борщ 0', 'Суп'])
+
+    @override_settings(RECIPE_SEARCH_MAX_RESULTS=5000)
+    def test_many_matches_stay_within_sqlite_variable_limit(self):
+        self.create_recipes(1200)
+        self.assertEqual(
+            len(self.search('борщ')), search.SQLITE_MAX_RESULTS)
+
+
+class BenchmarkSearchCommandTest(TestCase):
+    def tearDown(self):
+        search.recipe_index.invalidate()
+
+    def test_runs_on_empty_database(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark_search', '--recipes', '50', '--queries', '10',
+            '--batch-size', '20', stdout=stdout)
+        self.assertIn('10 queries:', stdout.getvalue())
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(RecipeIngredient.objects.exists())
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes import versions
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+
+class TouchRecipeTest(TestCase):
+    def setUp(self):
+        self.tags = create_tags(2)
+        self.ingredients = create_ingredients(3)
+        self.recipe = create_recipe(
+            create_user('author'), self.tags[:1], self.ingredients)
+        self.stale = timezone.now() - timedelta(days=1)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=self.stale)
+
+    def assertTouched(self):
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, self.stale)
+
+    def test_ingredient_row_edit_touches_recipe(self):
+        row = RecipeIngredient.objects.filter(recipe=self.recipe).first()
+        row.amount += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        self.assertTouched()
+
+    def test_tag_row_added_touches_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeTag.objects.create(recipe=self.recipe, tag=self.tags[1])
+        self.assertTouched()
+
+    def test_ingredient_delete_cascade_touches_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredients[0].delete()
+        self.assertTouched()
+
+    def test_recipes_version_is_bumped_after_touch(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            versions.bump_on_commit(versions.RECIPES)
+            versions.touch_recipes_on_commit(self.recipe.pk)
+        before = versions.get_versions(versions.RECIPES)[versions.RECIPES]
+        callbacks[0]()
+        self.assertTouched()
+        after = versions.get_versions(versions.RECIPES)[versions.RECIPES]
+        self.assertEqual(after.version, before.version + 1)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+    png,
+)
+from recipes import images
+from recipes.models import Recipe
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=media_root.name, MEDIA_GC_GRACE_PERIOD=60)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def age(self, name, seconds=3600):
+        past = time.time() - seconds
+        os.utime(default_storage.path(name), (past, past))
+
+
+class ContentAddressedStorageTest(MediaTestCase):
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('recipes/a.PNG', ContentFile(png()))
+        second = default_storage.save('recipes/b.png', ContentFile(png()))
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.png'))
+        self.assertEqual(
+            os.listdir(os.path.dirname(default_storage.path(first))),
+            [os.path.basename(first)])
+
+    def test_different_content_gets_different_names(self):
+        first = default_storage.save('recipes/a.png', ContentFile(png()))
+        second = default_storage.save('recipes/a.png', ContentFile(b'other'))
+        self.assertNotEqual(first, second)
+
+
+class ReleaseTest(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        author = create_user('author')
+        tags, ingredients = create_tags(1), create_ingredients(1)
+        self.recipes = [
+            create_recipe(author, tags, ingredients, f'Recipe {number}')
+            for number in range(2)]
+        self.name = self.recipes[0].image.name
+        self.assertEqual(self.recipes[1].image.name, self.name)
+        self.age(self.name)
+
+    def test_shared_image_survives_until_last_reference(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertTrue(default_storage.exists(self.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[1].delete()
+        self.assertFalse(default_storage.exists(self.name))
+
+    def test_recent_files_are_kept(self):
+        self.age(self.name, seconds=0)
+        Recipe.objects.all().delete()
+        images.release([self.name])
+        self.assertTrue(default_storage.exists(self.name))
+
+
+class GCMediaTest(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(
+            create_user('author'), create_tags(1), create_ingredients(1))
+        self.orphan = default_storage.save(
+            'recipes/orphan.png', ContentFile(b'orphan'))
+        self.fresh = default_storage.save(
+            'recipes/fresh.png', ContentFile(b'fresh'))
+        self.age(self.orphan)
+        self.age(self.recipe.image.name)
+
+    def gc_media(self, *args):
+        stdout = StringIO()
+        call_command('gc_media', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_deletes_old_unreferenced_files(self):
+        output = self.gc_media()
+        self.assertIn('Deleted 1 of 3 files', output)
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.fresh))
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_dry_run_only_lists_orphans(self):
+        output = self.gc_media('--dry-run')
+        self.assertIn(self.orphan, output)
+        self.assertIn('Would delete 1 of 3 files', output)
+        self.assertTrue(default_storage.exists(self.orphan))
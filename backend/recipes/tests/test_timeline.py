@@ -0,0 +1,78 @@
+from django.test import TestCase, override_settings
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes import timeline
+from recipes.models import FeedEntry
+from users.models import Subscription, User
+
+
+@override_settings(TIMELINE_FANOUT_THRESHOLD=2)
+class PullToPushTransitionTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.subscribers = [create_user(f'reader{number}')
+                            for number in range(3)]
+        self.tags = create_tags(1)
+        self.ingredients = create_ingredients(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for subscriber in self.subscribers:
+                Subscription.objects.create(
+                    subscriber=subscriber, author=self.author)
+            self.recipes = [
+                create_recipe(self.author, self.tags, self.ingredients,
+                              name=f'Recipe {number}')
+                for number in range(3)]
+
+    def test_pull_author_recipes_are_not_pushed(self):
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def assertBackfilled(self, subscribers):
+        for subscriber in subscribers:
+            self.assertEqual(
+                set(FeedEntry.objects.filter(user=subscriber).values_list(
+                    'recipe_id', flat=True)),
+                {recipe.pk for recipe in self.recipes})
+            self.assertEqual(len(timeline.timeline(subscriber)), 3)
+
+    def test_recent_recipes_are_backfilled_when_author_leaves_pull(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.get(subscriber=self.subscribers[0]).delete()
+
+        self.assertBackfilled(self.subscribers[1:])
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.subscribers[0]).exists())
+
+    def test_bulk_unfollow_past_threshold_resumes_push(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.filter(
+                subscriber__in=self.subscribers[:2]).delete()
+
+        self.assertBackfilled(self.subscribers[2:])
+        self.assertEqual(FeedEntry.objects.count(), 3)
+
+    def test_cascaded_unfollow_resumes_push(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(
+                pk__in=[user.pk for user in self.subscribers[:2]]).delete()
+
+        self.assertBackfilled(self.subscribers[2:])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=1)
+    def test_author_still_above_threshold_is_not_pushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.get(subscriber=self.subscribers[0]).delete()
+
+        self.assertFalse(FeedEntry.objects.exists())
+
+    @override_settings(TIMELINE_BACKFILL=2)
+    def test_backfill_is_limited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.get(subscriber=self.subscribers[0]).delete()
+
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.subscribers[1]).count(), 2)
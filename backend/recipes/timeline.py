@@ -0,0 +1,158 @@
+import base64
+import heapq
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, UserStats
+
+_pending = threading.local()
+
+
+def fanout_threshold(threshold=None):
+    if threshold is None:
+        return settings.TIMELINE_FANOUT_THRESHOLD
+    return threshold
+
+
+def is_pull_author(author_id, threshold=None):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        subscribers_count__gt=fanout_threshold(threshold)).exists()
+
+
+def push_recipes(user_ids, recipes):
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe.pk,
+                   author_id=recipe.author_id, pub_date=recipe.pub_date)
+         for user_id in user_ids for recipe in recipes),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def subscriber_batches(author_id):
+    subscribers = Subscription.objects.filter(
+        author_id=author_id).order_by('id').values_list('id', 'subscriber_id')
+    last_id = 0
+    while True:
+        batch = list(subscribers.filter(
+            id__gt=last_id)[:settings.TIMELINE_BATCH_SIZE])
+        if not batch:
+            return
+        yield [user_id for _, user_id in batch]
+        last_id = batch[-1][0]
+
+
+def recent_recipes(author_id):
+    return Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').only(
+            'id', 'author_id', 'pub_date')[:settings.TIMELINE_BACKFILL]
+
+
+def fan_out(recipe, threshold=None):
+    if is_pull_author(recipe.author_id, threshold):
+        return 0
+    pushed = 0
+    for user_ids in subscriber_batches(recipe.author_id):
+        push_recipes(user_ids, [recipe])
+        pushed += len(user_ids)
+    return pushed
+
+
+def fan_out_on_commit(recipe):
+    transaction.on_commit(lambda: fan_out(recipe))
+
+
+def backfill(subscription):
+    if is_pull_author(subscription.author_id):
+        return
+    push_recipes([subscription.subscriber_id],
+                 recent_recipes(subscription.author_id))
+
+
+def resume_push(author_id, previous_count, threshold=None):
+    threshold = fanout_threshold(threshold)
+    if (previous_count is None or previous_count <= threshold
+            or is_pull_author(author_id, threshold)):
+        return 0
+    recipes = list(recent_recipes(author_id))
+    if not recipes:
+        return 0
+    pushed = 0
+    for user_ids in subscriber_batches(author_id):
+        push_recipes(user_ids, recipes)
+        pushed += len(user_ids)
+    return pushed
+
+
+def _resume_pending():
+    counts = getattr(_pending, 'subscribers_counts', None)
+    if counts:
+        _pending.subscribers_counts = {}
+        for author_id, previous_count in counts.items():
+            resume_push(author_id, previous_count)
+
+
+def resume_push_on_commit(author_id):
+    if getattr(_pending, 'subscribers_counts', None) is None:
+        _pending.subscribers_counts = {}
+    if author_id not in _pending.subscribers_counts:
+        _pending.subscribers_counts[author_id] = UserStats.objects.filter(
+            user_id=author_id).values_list(
+                'subscribers_count', flat=True).first()
+    transaction.on_commit(_resume_pending)
+
+
+def unfollow(subscription):
+    FeedEntry.objects.filter(
+        user_id=subscription.subscriber_id,
+        author_id=subscription.author_id).delete()
+
+
+def encode_cursor(pub_date, recipe_id):
+    position = f'{pub_date.isoformat()}|{recipe_id}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    position = base64.urlsafe_b64decode(cursor.encode()).decode()
+    pub_date, recipe_id = position.split('|')
+    return datetime.fromisoformat(pub_date), int(recipe_id)
+
+
+def before(cursor, date_field, id_field):
+    if cursor is None:
+        return Q()
+    pub_date, recipe_id = cursor
+    return Q(**{f'{date_field}__lt': pub_date}) | Q(
+        **{date_field: pub_date, f'{id_field}__lt': recipe_id})
+
+
+def timeline(user, cursor=None, limit=10, threshold=None):
+    pushed = FeedEntry.objects.filter(
+        before(cursor, 'pub_date', 'recipe_id'), user=user).order_by(
+            '-pub_date', '-recipe_id').values_list(
+                'pub_date', 'recipe_id')[:limit]
+    pull_authors = Subscription.objects.filter(
+        subscriber=user,
+        author__stats__subscribers_count__gt=fanout_threshold(threshold),
+    ).values('author_id')
+    pulled = Recipe.objects.filter(
+        before(cursor, 'pub_date', 'id'),
+        author_id__in=pull_authors).order_by(
+            '-pub_date', '-id').values_list('pub_date', 'id')[:limit]
+
+    entries = []
+    seen = set()
+    for pub_date, recipe_id in heapq.merge(
+            list(pushed), list(pulled), reverse=True):
+        if recipe_id not in seen:
+            seen.add(recipe_id)
+            entries.append((pub_date, recipe_id))
+        if len(entries) == limit:
+            break
+    return entries
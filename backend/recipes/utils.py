@@ -1,2 +1,6 @@
 def user_directory_path(instance, filename):
     return 'user_{0}/{1}'.format(instance.author.username, filename)
+
+
+def recipe_image_path(instance, filename):
+    return 'recipes/{0}'.format(filename)
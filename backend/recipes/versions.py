@@ -0,0 +1,84 @@
+import threading
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.models import Recipe, TableVersion
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+RECIPES = 'recipes'
+USERS = 'users'
+
+_pending = threading.local()
+_batch = ContextVar('version_batch', default=None)
+
+
+def bump(*tables):
+    tables = set(tables)
+    now = timezone.now()
+    updated = TableVersion.objects.filter(table__in=tables).update(
+        version=F('version') + 1, updated_at=now)
+    if updated < len(tables):
+        for table in tables:
+            TableVersion.objects.get_or_create(
+                table=table, defaults={'version': 1, 'updated_at': now})
+
+
+def _bump_pending():
+    tables = getattr(_pending, 'tables', None)
+    if not tables:
+        return
+    _pending.tables = set()
+    if RECIPES in tables:
+        _touch_pending()
+    batch = _batch.get()
+    if batch is None:
+        bump(*tables)
+    else:
+        batch.update(tables)
+
+
+def bump_on_commit(*tables):
+    if getattr(_pending, 'tables', None) is None:
+        _pending.tables = set()
+    _pending.tables.update(tables)
+    transaction.on_commit(_bump_pending)
+
+
+def _touch_pending():
+    recipe_ids = getattr(_pending, 'recipe_ids', None)
+    if recipe_ids:
+        _pending.recipe_ids = set()
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now())
+
+
+def touch_recipes_on_commit(*recipe_ids):
+    if getattr(_pending, 'recipe_ids', None) is None:
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(_touch_pending)
+
+
+def start_batch():
+    return _batch.set(set())
+
+
+def finish_batch(token):
+    tables = _batch.get()
+    _batch.reset(token)
+    return tables
+
+
+def get_versions(*tables):
+    versions = {
+        version.table: version
+        for version in TableVersion.objects.filter(table__in=tables)
+    }
+    return {
+        table: versions.get(table, TableVersion(table=table, version=0))
+        for table in tables
+    }
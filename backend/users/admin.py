@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from users.models import Subscription, User
+from users.models import Subscription, User, UserStats
 
 
 class CustomUserAdmin(UserAdmin):
@@ -15,6 +15,18 @@ class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('id', 'subscriber', 'author')
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipes_count', 'subscribers_count')
+    list_select_related = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Subscription, SubscriptionAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserStats = apps.get_model('users', 'UserStats')
+    users = User.objects.annotate(
+        total_recipes=Count('recipes', distinct=True),
+        total_subscribers=Count('authors', distinct=True))
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user.pk,
+                   recipes_count=user.total_recipes,
+                   subscribers_count=user.total_subscribers)
+         for user in users.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_auto_20221117_1124'),
+        ('recipes', '0010_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='auth.user', verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+                ('subscribers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_index_plan'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userstats',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.AlterField(
+            model_name='userstats',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+    ]
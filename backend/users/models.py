@@ -9,12 +9,14 @@ class Subscription(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='subscribers',
+        db_index=False,
         verbose_name='Подписчик'
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='authors',
+        db_index=False,
         verbose_name='Автор'
     )
 
@@ -25,8 +27,42 @@ class Subscription(models.Model):
                 name='unique_subscriber_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'subscriber'],
+                name='subscription_author_idx'
+            )
+        ]
         verbose_name_plural = 'Подписки'
 
     def __str__(self):
         return (f'{self.subscriber.username} to '
                 f'{self.author.username}')
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return (f'{self.user.username}: {self.recipes_count} recipes, '
+                f'{self.subscribers_count} subscribers')
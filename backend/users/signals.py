@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users import stats
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Subscription)
+def count_subscription(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'subscribers_count')
+
+
+@receiver(post_delete, sender=Subscription)
+def uncount_subscription(sender, instance, **kwargs):
+    stats.increment(instance.author_id, 'subscribers_count', -1)
@@ -0,0 +1,25 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from users.models import UserStats
+
+
+def increment(user_id, field, delta=1):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) + delta, 0)})
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(user_id=user_id, **{field: delta})
+    except IntegrityError:
+        UserStats.objects.filter(user_id=user_id).update(
+            **{field: Greatest(F(field) + delta, 0)})
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from api.tests.fixtures import (
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from recipes.models import Favorite, Recipe
+from users import stats
+from users.models import Subscription, UserStats
+
+
+class CounterClampTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.subscriber = create_user('subscriber')
+
+    def test_decrement_stops_at_zero(self):
+        stats.increment(self.author.pk, 'subscribers_count')
+        stats.increment(self.author.pk, 'subscribers_count', -1)
+        stats.increment(self.author.pk, 'subscribers_count', -1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).subscribers_count, 0)
+
+    def test_unsubscribe_with_drifted_counter(self):
+        subscription = Subscription.objects.create(
+            subscriber=self.subscriber, author=self.author)
+        UserStats.objects.filter(user=self.author).update(
+            subscribers_count=0)
+        subscription.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).subscribers_count, 0)
+
+    def test_unfavorite_with_drifted_counter(self):
+        recipe = create_recipe(
+            self.author, create_tags(1), create_ingredients(1))
+        favorite = Favorite.objects.create(
+            user=self.subscriber, recipe=recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=0)
+        favorite.delete()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)